@@ -34,10 +34,26 @@ celery_app = Celery(
 )
 
 celery_app.conf.beat_schedule = {
-    "scan-every-10-seconds": {
-        "task": "scan_for_violations",
-        "schedule": 10.0,
-    }
+    # Cheap check; the scan interval itself adapts to traffic (app.scheduler)
+    "scan-scheduler-tick": {
+        "task": "scan_scheduler_tick",
+        "schedule": settings.SCAN_TICK,
+        "options": {"expires": settings.SCAN_TICK},
+    },
+    "maintain-violation-partitions": {
+        "task": "maintain_violation_partitions",
+        "schedule": 3600.0,
+    },
+    # Also loads the window from Postgres when Redis comes up empty
+    "trim-violation-window": {
+        "task": "trim_violation_window",
+        "schedule": settings.VIOLATION_WINDOW_TRIM_SECONDS,
+        "options": {"expires": settings.VIOLATION_WINDOW_TRIM_SECONDS},
+    },
+    "prune-drone-tracks": {
+        "task": "prune_drone_tracks",
+        "schedule": 3600.0,
+    },
 }
 
 celery_app.conf.timezone = "UTC"
@@ -17,6 +17,129 @@ class Settings(BaseSettings):
 
     LOG_TO_FILE: int = 0
 
+    # Logging: "json" or "text" lines; app.log (LOG_TO_FILE=1) rotates at
+    # LOG_FILE_MAX_BYTES keeping LOG_FILE_BACKUPS old files. Repeated
+    # per-drone events are logged at most once per LOG_RATE_LIMIT_SECONDS.
+    LOG_FORMAT: str = "json"
+    LOG_FILE_MAX_BYTES: int = 10_000_000
+    LOG_FILE_BACKUPS: int = 5
+    LOG_RATE_LIMIT_SECONDS: float = 60.0
+
+    # Async DB pool used by the API read endpoints
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800        # seconds, -1 disables
+    DB_STATEMENT_TIMEOUT_MS: int = 5000
+
+    # /nfz/export: rows per server-side cursor fetch, statement timeout (0 = none)
+    EXPORT_BATCH_SIZE: int = 2000
+    EXPORT_STATEMENT_TIMEOUT_MS: int = 0
+
+    # Violations are partitioned by day; partitions older than the retention
+    # period are dropped, and new ones are created this many days ahead
+    VIOLATION_RETENTION_DAYS: int = 30
+    VIOLATION_PARTITIONS_AHEAD: int = 7
+
+    # Hot 24h violation window in Redis, read by /nfz: trimmed every
+    # VIOLATION_WINDOW_TRIM_SECONDS and capped at VIOLATION_WINDOW_MAX_ENTRIES
+    # (pages older than what the cap keeps are read from Postgres)
+    VIOLATION_WINDOW_TRIM_SECONDS: float = 60.0
+    VIOLATION_WINDOW_MAX_ENTRIES: int = 500_000
+
+    # An open violation episode is closed once its drone has been outside
+    # every zone for this many seconds
+    EPISODE_CLOSE_AFTER: float = 15.0
+
+    # Position history: samples per drone buffered in a worker before a flush,
+    # max seconds between flushes, days kept in drone_tracks
+    TRACK_CAPACITY: int = 32
+    TRACK_FLUSH_INTERVAL: float = 60.0
+    TRACK_RETENTION_DAYS: int = 7
+
+    # Incursion prediction: look-ahead and sampling step (seconds), max age of
+    # the previous snapshot for a velocity estimate, min speed (units/s)
+    PREDICT_HORIZON: float = 30.0
+    PREDICT_STEP: float = 2.0
+    PREDICT_MAX_GAP: float = 60.0
+    PREDICT_MIN_SPEED: float = 0.5
+
+    # Drone snapshot shared by /drones, /api/map-data and the scanner (seconds)
+    SNAPSHOT_INTERVAL: float = 5.0
+    SNAPSHOT_LOCK_TIMEOUT: float = 10.0
+    DRONES_FETCH_TIMEOUT: float = 5.0
+    # Drones parsed per chunk while the upstream list is streamed
+    DRONES_PARSE_CHUNK: int = 5000
+    # Drone-list retries (jittered backoff base, seconds) within DRONES_FETCH_DEADLINE
+    # seconds overall (keep it below SNAPSHOT_LOCK_TIMEOUT); when it fails, the last
+    # good snapshot is served marked stale for up to SNAPSHOT_MAX_STALE seconds
+    DRONES_FETCH_RETRIES: int = 1
+    DRONES_FETCH_BACKOFF: float = 0.2
+    DRONES_FETCH_DEADLINE: float = 8.0
+    SNAPSHOT_MAX_STALE: float = 300.0
+
+    # Upstream circuit breakers (per API, per process): open after this many
+    # consecutive failures, probe again every UPSTREAM_BREAKER_RESET seconds.
+    # UPSTREAM_HEDGE_AFTER: send a second request when the first has not
+    # answered within this many seconds (0 = no hedging)
+    UPSTREAM_BREAKER_FAILURES: int = 5
+    UPSTREAM_BREAKER_RESET: float = 30.0
+    UPSTREAM_HEDGE_AFTER: float = 0.0
+
+    # Scan triggers from the API: at most one in flight, none within SCAN_MIN_INTERVAL
+    # seconds of the last one. SCAN_LOCK_TTL frees the slot if a worker dies mid-scan.
+    SCAN_MIN_INTERVAL: float = 5.0
+    SCAN_LOCK_TTL: int = 60
+
+    # Adaptive scan schedule (seconds): beat checks every SCAN_TICK, the interval
+    # moves between MIN and MAX with traffic and backs off by SCAN_BACKOFF when quiet.
+    # MIN is raised to SNAPSHOT_INTERVAL: scanning faster only rereads one snapshot.
+    # UPSTREAM_BUDGET_PER_MINUTE caps drone-list fetches (0 = no cap).
+    SCAN_TICK: float = 1.0
+    SCAN_INTERVAL_MIN: float = 2.0
+    SCAN_INTERVAL_DEFAULT: float = 10.0
+    SCAN_INTERVAL_MAX: float = 60.0
+    SCAN_BACKOFF: float = 1.5
+    UPSTREAM_BUDGET_PER_MINUTE: int = 20
+
+    # Fan-out: snapshots of at least SCAN_SHARD_MIN_DRONES drones are split into
+    # SCAN_SHARDS shard tasks (1 = always scan in a single task)
+    SCAN_SHARDS: int = 1
+    SCAN_SHARD_MIN_DRONES: int = 20000
+
+    # /stream (SSE): per-client backlog before a resync, keep-alive interval (seconds)
+    STREAM_QUEUE_SIZE: int = 100
+    STREAM_HEARTBEAT: float = 15.0
+
+    # Owner API client
+    OWNER_FETCH_CONCURRENCY: int = 20
+    OWNER_FETCH_TIMEOUT: float = 5.0
+    OWNER_FETCH_RETRIES: int = 2
+    OWNER_FETCH_BACKOFF: float = 0.2   # seconds, doubled on every retry
+
+    # Owner cache: in-process LRU + Redis (seconds)
+    OWNER_CACHE_SIZE: int = 10000
+    OWNER_CACHE_TTL: int = 600
+    OWNER_CACHE_REDIS_TTL: int = 86400
+    OWNER_CACHE_NEGATIVE_TTL: int = 300
+
+    # No-fly zones: the no_fly_zones table wins, then this JSON file,
+    # then the default 1000-unit circle at the origin
+    NFZ_ZONES_FILE: str = ""
+    NFZ_ZONES_REFRESH_SECONDS: int = 60
+    NFZ_GRID_CELL_SIZE: float = 0.0   # 0 = derive from zone sizes
+
+    # Prometheus: the API serves /metrics; each Celery worker process serves its
+    # own on WORKER_METRICS_PORT + process index (0 = no worker exporter)
+    WORKER_METRICS_PORT: int = 0
+
+    # Sampling profiler (pyinstrument, optional): scans taking at least
+    # SCAN_PROFILE_MIN_SECONDS are saved to SCAN_PROFILE_DIR as speedscope files
+    SCAN_PROFILE: bool = False
+    SCAN_PROFILE_MIN_SECONDS: float = 5.0
+    SCAN_PROFILE_INTERVAL: float = 0.001
+    SCAN_PROFILE_DIR: str = "profiles"
+
     class Config:
         env_file = ".env"
         extra = "ignore"   # Ignore any unused vars to prevent crashes
@@ -1,8 +1,37 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from app.config import settings
 
+# Sync engine: Celery tasks, migrations
 engine = create_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+
+def async_database_url(url: str) -> str:
+    """Same database through asyncpg (postgresql:// or postgresql+psycopg2:// -> postgresql+asyncpg://)."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "postgresql":
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    return parsed.render_as_string(hide_password=False)
+
+
+def _async_connect_args() -> dict:
+    if make_url(settings.DATABASE_URL).get_backend_name() != "postgresql":
+        return {}
+    return {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+
+
+# Async engine: FastAPI read endpoints
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL),
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    connect_args=_async_connect_args(),
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
@@ -0,0 +1,190 @@
+import json
+import math
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.logger import logger
+from app.model import ViolationEpisode
+from app.redis_client import redis_client
+from app.utils import report_violations
+
+
+# drone_id -> JSON state of its open episode
+OPEN_KEY = "airguardian:episodes:open"
+
+
+def collect_sightings(batch, zone_idx: np.ndarray, registry) -> dict:
+    """drone_id -> sighting for every drone with an id and an owner that is inside a zone."""
+    sightings = {}
+    for i in np.flatnonzero(zone_idx >= 0).tolist():
+        drone = batch.drones[i]
+        owner_id = drone.get("owner_id")
+        # Without an id, sightings of different drones can't be told apart
+        if owner_id is None or drone.get("id") is None:
+            continue
+
+        zone = registry.zones[zone_idx[i]]
+        center_x, center_y = zone.reference_point()
+        x, y, z = float(batch.x[i]), float(batch.y[i]), float(batch.z[i])
+
+        sightings[str(drone.get("id"))] = {
+            "drone_id": drone.get("id"),
+            "owner_id": str(owner_id),
+            "zone_id": zone.zone_id,
+            "x": x,
+            "y": y,
+            "z": z,
+            "distance": math.hypot(x - center_x, y - center_y),
+        }
+    return sightings
+
+
+def _to_datetime(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, tz=timezone.utc)
+
+
+def _load_open() -> dict:
+    return {
+        drone_id.decode(): json.loads(raw)
+        for drone_id, raw in redis_client.hgetall(OPEN_KEY).items()
+    }
+
+
+def track_episodes(sightings: dict, db: Session) -> dict:
+    """
+    Advance the open episodes with this scan's sightings.
+    - New drones in a zone: one Violation row + a new episode (same transaction)
+    - Drones still inside the same zone: only the Redis state is updated
+    - Drones that moved into another zone: the episode is closed and a new one opened
+    - Drones gone for EPISODE_CLOSE_AFTER seconds: the episode is closed in the DB
+    Returns counts of opened / continued / closed episodes.
+    """
+    now = time.time()
+    state = _load_open()
+
+    # -----------------------------------------
+    # 1. Continuing episodes: Redis only
+    # -----------------------------------------
+    continued = {}
+    switched = {}
+    for drone_id, sighting in sightings.items():
+        episode = state.get(drone_id)
+        if episode is None:
+            continue
+        # Episodes stored before zone_id was recorded keep going in any zone
+        if episode.get("zone_id", sighting["zone_id"]) != sighting["zone_id"]:
+            switched[drone_id] = episode
+            continue
+        episode["last_seen"] = now
+        episode["samples"] += 1
+        if sighting["distance"] < episode["closest"][0]:
+            episode["closest"] = [sighting["distance"], sighting["x"], sighting["y"], sighting["z"]]
+        continued[drone_id] = episode
+
+    # -----------------------------------------
+    # 2. Opened episodes: violation + episode row, one commit
+    # -----------------------------------------
+    opening = [s for drone_id, s in sightings.items() if drone_id not in state or drone_id in switched]
+    opened = {}
+
+    def insert_episodes(rows):
+        if not rows:
+            return
+        result = db.execute(
+            insert(ViolationEpisode).returning(ViolationEpisode.id, sort_by_parameter_order=True),
+            [
+                {
+                    "drone_id": row["drone_id"],
+                    "owner_id": row["owner_id"],
+                    "zone_id": sightings[str(row["drone_id"])]["zone_id"],
+                    "opened_at": row["timestamp"],
+                    "last_seen_at": row["timestamp"],
+                    "closest_distance": sightings[str(row["drone_id"])]["distance"],
+                    "closest_x": row["x"],
+                    "closest_y": row["y"],
+                    "closest_z": row["z"],
+                    "sample_count": 1,
+                }
+                for row in rows
+            ],
+        )
+        for row, episode_id in zip(rows, result.scalars().all()):
+            sighting = sightings[str(row["drone_id"])]
+            opened[str(row["drone_id"])] = {
+                "id": episode_id,
+                "zone_id": sighting["zone_id"],
+                "opened_at": now,
+                "last_seen": now,
+                "samples": 1,
+                "closest": [sighting["distance"], row["x"], row["y"], row["z"]],
+            }
+
+    if opening:
+        records = [
+            {key: s[key] for key in ("drone_id", "owner_id", "x", "y", "z")}
+            for s in opening
+        ]
+        report_violations(records, db, before_commit=insert_episodes)
+
+        # One line per drone entering a zone; a drone flapping on a zone edge is rate-limited
+        for drone_id in opened:
+            sighting = sightings[drone_id]
+            logger.info(
+                f"Drone {drone_id} entered zone {sighting['zone_id']}",
+                extra={
+                    "event": "violation",
+                    "drone_id": drone_id,
+                    "owner_id": sighting["owner_id"],
+                    "zone_id": sighting["zone_id"],
+                    "position": [sighting["x"], sighting["y"], sighting["z"]],
+                    "rate_key": f"violation:{drone_id}",
+                },
+            )
+
+    # -----------------------------------------
+    # 3. Closed episodes: one bulk update
+    # -----------------------------------------
+    closing = {
+        drone_id: episode
+        for drone_id, episode in state.items()
+        if drone_id not in sightings and now - episode["last_seen"] >= settings.EPISODE_CLOSE_AFTER
+    }
+    closing.update(switched)
+
+    if closing:
+        db.execute(
+            update(ViolationEpisode),
+            [
+                {
+                    "id": episode["id"],
+                    "last_seen_at": _to_datetime(episode["last_seen"]),
+                    "closed_at": _to_datetime(now),
+                    "closest_distance": episode["closest"][0],
+                    "closest_x": episode["closest"][1],
+                    "closest_y": episode["closest"][2],
+                    "closest_z": episode["closest"][3],
+                    "sample_count": episode["samples"],
+                }
+                for episode in closing.values()
+            ],
+        )
+        db.commit()
+
+    # -----------------------------------------
+    # 4. Redis state, once the DB is up to date
+    # -----------------------------------------
+    pipe = redis_client.pipeline(transaction=True)
+    for drone_id, episode in {**continued, **opened}.items():
+        pipe.hset(OPEN_KEY, drone_id, json.dumps(episode))
+    # A drone that switched zones may already have its new episode in `opened`
+    ended = [drone_id for drone_id in closing if drone_id not in opened]
+    if ended:
+        pipe.hdel(OPEN_KEY, *ended)
+    pipe.execute()
+
+    return {"opened": len(opened), "continued": len(continued), "closed": len(closing)}
@@ -0,0 +1,84 @@
+import csv
+import io
+from datetime import datetime, timezone
+
+import orjson
+from sqlalchemy import select, text
+
+from app.config import settings
+from app.drone_db import AsyncSessionLocal
+from app.logger import logger
+from app.model import Owner, Violation
+from app.violation_queries import PAGE_COLUMNS, violation_dict
+
+
+CSV_HEADER = (
+    "id", "drone_id", "timestamp", "x", "y", "z",
+    "first_name", "last_name", "social_security_number", "phone_number",
+)
+
+
+def as_utc(value: datetime) -> datetime:
+    """Query parameters without an offset are taken as UTC."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+async def _row_batches(start: datetime, end: datetime):
+    """
+    Violations in [start, end) with owner data, oldest first, in batches of
+    EXPORT_BATCH_SIZE rows read from a server-side cursor.
+    The session is opened here: the response body outlives request dependencies.
+    """
+    async with AsyncSessionLocal() as db:
+        if db.bind.dialect.name == "postgresql":
+            # Applies to this transaction only, the pool keeps the API-wide timeout
+            await db.execute(text(f"SET LOCAL statement_timeout = {int(settings.EXPORT_STATEMENT_TIMEOUT_MS)}"))
+
+        result = await db.stream(
+            select(*PAGE_COLUMNS)
+            .join(Owner, Violation.owner_id == Owner.id)
+            .where(Violation.timestamp >= start, Violation.timestamp < end)
+            .order_by(Violation.timestamp, Violation.id)
+            .execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+        )
+        async for rows in result.partitions():
+            yield rows
+
+
+async def export_ndjson(start: datetime, end: datetime):
+    """One ViolationOut-shaped JSON object per line."""
+    total = 0
+    async for rows in _row_batches(start, end):
+        total += len(rows)
+        yield b"".join(
+            orjson.dumps(violation_dict(row), option=orjson.OPT_UTC_Z | orjson.OPT_APPEND_NEWLINE)
+            for row in rows
+        )
+    logger.info(f"Exported {total} violations as NDJSON ({start} .. {end})")
+
+
+async def export_csv(start: datetime, end: datetime):
+    """Flat CSV, owner fields as extra columns."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    yield buffer.getvalue().encode()
+
+    total = 0
+    async for rows in _row_batches(start, end):
+        total += len(rows)
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            (row[0], row[1], as_utc(row[2]).isoformat().replace("+00:00", "Z"), *row[3:])
+            for row in rows
+        )
+        yield buffer.getvalue().encode()
+    logger.info(f"Exported {total} violations as CSV ({start} .. {end})")
+
+
+# format (also the file extension) -> body generator, media type
+EXPORT_FORMATS = {
+    "ndjson": (export_ndjson, "application/x-ndjson"),
+    "csv": (export_csv, "text/csv"),
+}
@@ -1,26 +1,372 @@
+import asyncio
+import random
+import time
+import weakref
+
 import httpx
-import requests
+import ijson
 
 from app.config import settings
+from app.logger import logger
+from app.metrics import SCAN_STAGE_SECONDS, UPSTREAM_BREAKER_OPEN, UPSTREAM_HEDGES, UPSTREAM_SECONDS
 
 
 # Read API URLs from config
 DRONES_API = settings.DRONES_API
 DRONES_LIST_API = settings.DRONES_LIST_API
 
+# Status codes worth retrying
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# One pooled AsyncClient per event loop (a client cannot be shared across loops)
+_async_clients = weakref.WeakKeyDictionary()
+
+# Long-lived loop for sync callers (Celery), so pooled connections survive between scans
+_worker_loop = None
+
+# fetch_owner_async result for an owner whose lookup failed (as opposed to None: not found)
+UNAVAILABLE = object()
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised instead of calling an upstream API whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Per-process breaker for one upstream API. It opens after `failures`
+    consecutive failures, so callers fail at once instead of each waiting
+    for a timeout. Every `reset_after` seconds one request is let through
+    as a probe; a success closes the breaker, a failure keeps it open.
+    """
+
+    def __init__(self, api: str, failures: int, reset_after: float):
+        self.api = api
+        self.failures = failures
+        self.reset_after = reset_after
+        self._consecutive = 0
+        self._opened_at = None
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_after:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        if time.monotonic() - self._opened_at < self.reset_after:
+            return False
+        # Half-open: this request probes, the others wait for another period
+        self._opened_at = time.monotonic()
+        return True
+
+    def check(self):
+        if not self.allow():
+            raise CircuitOpenError(f"{self.api} unavailable (circuit open)")
+
+    def success(self):
+        if self._opened_at is not None:
+            logger.info(f"Upstream {self.api}: circuit closed")
+        self._consecutive = 0
+        self._opened_at = None
+        UPSTREAM_BREAKER_OPEN.labels(self.api).set(0)
+
+    def failure(self):
+        self._consecutive += 1
+        if self._consecutive < self.failures:
+            return
+        if self._opened_at is None:
+            logger.warning(f"Upstream {self.api}: circuit open after {self._consecutive} failures")
+        self._opened_at = time.monotonic()
+        UPSTREAM_BREAKER_OPEN.labels(self.api).set(1)
+
+
+drone_list_breaker = CircuitBreaker("drone_list", settings.UPSTREAM_BREAKER_FAILURES, settings.UPSTREAM_BREAKER_RESET)
+owner_breaker = CircuitBreaker("owner", settings.UPSTREAM_BREAKER_FAILURES, settings.UPSTREAM_BREAKER_RESET)
+
+
+def upstream_status() -> dict:
+    return {breaker.api: breaker.state for breaker in (drone_list_breaker, owner_breaker)}
+
+
+def backoff_delay(base: float, attempt: int) -> float:
+    """Full jitter: retries from many callers spread out instead of arriving together."""
+    return random.uniform(0, base * 2 ** attempt)
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRY_STATUS
+    return isinstance(error, httpx.TransportError) and not isinstance(error, CircuitOpenError)
+
+
+async def hedged(call, delay: float, discard=None):
+    """
+    Await `call()`; if it has not finished after `delay` seconds (0 = never),
+    start a second, identical call and return whichever succeeds first.
+    The other one is cancelled, or passed to `discard` if it also finished.
+    """
+    first = asyncio.ensure_future(call())
+    if not delay:
+        return await first
+
+    tasks = [first]
+    done, _ = await asyncio.wait(tasks, timeout=delay)
+    if not done:
+        UPSTREAM_HEDGES.inc()
+        tasks.append(asyncio.ensure_future(call()))
+
+    winner = None
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winner = next((task for task in done if task.exception() is None), None)
+            if winner is not None:
+                return winner.result()
+        # Both failed: report the first one's error
+        return first.result()
+    finally:
+        for task in tasks:
+            if task is winner:
+                continue
+            if not task.done():
+                task.cancel()
+            elif discard is not None and task.exception() is None:
+                await discard(task.result())
+
+
+class _ByteStreamReader:
+    """
+    Async file-like read() over an async iterator of bytes, for ijson.
+    Time spent waiting for the next chunk is added to timings["fetch"].
+    """
 
-def fetch_owner(owner_id: str):
+    def __init__(self, byte_chunks, timings: dict = None):
+        self._chunks = byte_chunks.__aiter__()
+        self._buffer = b""
+        self._timings = timings
+
+    async def read(self, size: int = -1) -> bytes:
+        if not self._buffer:
+            started = time.perf_counter()
+            try:
+                self._buffer = await self._chunks.__anext__()
+            except StopAsyncIteration:
+                return b""
+            finally:
+                if self._timings is not None:
+                    self._timings["fetch"] += time.perf_counter() - started
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+async def iter_json_items(byte_chunks, chunk_size: int, timings: dict = None):
+    """
+    Parse a top-level JSON array incrementally from an async iterator of
+    bytes, yielding its items in lists of up to `chunk_size`.
+    Only one network chunk and one list of items are held at a time.
+    """
+    items = []
+    async for item in ijson.items_async(_ByteStreamReader(byte_chunks, timings), "item", use_float=True):
+        items.append(item)
+        if len(items) >= chunk_size:
+            yield items
+            items = []
+    if items:
+        yield items
+
+
+async def iter_drone_chunks(chunk_size: int = None, timings: dict = None):
+    """
+    Stream the upstream drone list, yielding drones in chunks as they are downloaded.
+    With UPSTREAM_HEDGE_AFTER set, a second request is raced against a slow first one
+    until the response headers arrive; the body is read from the winner only.
+    """
+    client = get_async_client()
+
+    def send():
+        request = client.build_request("GET", DRONES_LIST_API, timeout=settings.DRONES_FETCH_TIMEOUT)
+        return client.send(request, stream=True)
+
+    started = time.perf_counter()
+    status = "error"
+    try:
+        response = await hedged(send, settings.UPSTREAM_HEDGE_AFTER, discard=lambda late: late.aclose())
+        try:
+            status = str(response.status_code)
+            response.raise_for_status()
+            byte_chunks = response.aiter_bytes()
+            async for chunk in iter_json_items(byte_chunks, chunk_size or settings.DRONES_PARSE_CHUNK, timings):
+                yield chunk
+        finally:
+            await response.aclose()
+    finally:
+        UPSTREAM_SECONDS.labels("drone_list", status).observe(time.perf_counter() - started)
+
+
+async def _download_drones(on_chunk, timings: dict) -> list:
+    """
+    One breaker-guarded download, retried with jittered backoff on transport
+    errors and 429/5xx, as long as no chunk has been handed to `on_chunk` yet.
+    """
+    for attempt in range(settings.DRONES_FETCH_RETRIES + 1):
+        drone_list_breaker.check()
+        drones = []
+        try:
+            async for chunk in iter_drone_chunks(timings=timings):
+                if on_chunk is not None:
+                    # CPU-bound (e.g. classification): keep it off the event loop
+                    chunk_started = time.perf_counter()
+                    await asyncio.to_thread(on_chunk, chunk, len(drones))
+                    timings["classify"] += time.perf_counter() - chunk_started
+                drones.extend(chunk)
+        except httpx.HTTPError as e:
+            if not is_retryable(e):
+                raise
+            drone_list_breaker.failure()
+            if drones or attempt == settings.DRONES_FETCH_RETRIES:
+                raise
+            await asyncio.sleep(backoff_delay(settings.DRONES_FETCH_BACKOFF, attempt))
+            continue
+
+        drone_list_breaker.success()
+        return drones
+
+
+async def fetch_drones(on_chunk=None):
+    """
+    Fetch the upstream drone list without buffering the raw body.
+    `on_chunk(drones, offset)` is called in a worker thread for every parsed
+    chunk while the rest is still downloading, e.g. to classify it early.
+    Retries included, gives up after DRONES_FETCH_DEADLINE seconds, and at
+    once (CircuitOpenError) while the drone-list breaker is open.
+    """
+    timings = {"fetch": 0.0, "classify": 0.0}
+    started = time.perf_counter()
+    try:
+        drones = await asyncio.wait_for(_download_drones(on_chunk, timings), settings.DRONES_FETCH_DEADLINE)
+    except asyncio.TimeoutError:
+        drone_list_breaker.failure()
+        raise httpx.TimeoutException(f"Drone list not received within {settings.DRONES_FETCH_DEADLINE}s")
+
+    # Whatever was neither network wait nor classification went into parsing
+    elapsed = time.perf_counter() - started
+    SCAN_STAGE_SECONDS.labels("fetch").observe(timings["fetch"])
+    SCAN_STAGE_SECONDS.labels("parse").observe(elapsed - timings["fetch"] - timings["classify"])
+    if on_chunk is not None:
+        SCAN_STAGE_SECONDS.labels("classify").observe(timings["classify"])
+    return drones
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the shared pooled AsyncClient of the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.OWNER_FETCH_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.OWNER_FETCH_CONCURRENCY,
+                max_keepalive_connections=settings.OWNER_FETCH_CONCURRENCY,
+            ),
+        )
+        _async_clients[loop] = client
+
+    return client
+
+
+async def close_async_client():
+    """Close the shared client of the running event loop (app shutdown)."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def run_async(coro):
+    """Run a coroutine from sync code on a reused event loop."""
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+    return _worker_loop.run_until_complete(coro)
+
+
+async def fetch_owner_async(owner_id: str, semaphore: asyncio.Semaphore):
+    """
+    Fetch one owner, retrying transport errors and 429/5xx with jittered
+    exponential backoff (hedged after UPSTREAM_HEDGE_AFTER seconds, if set).
+    Returns None when the owner does not exist, UNAVAILABLE when all attempts
+    failed, the body is not JSON or the owner API's breaker is open.
+    """
+    client = get_async_client()
     url = f"{DRONES_API}{owner_id}"
-    response = requests.get(url)
 
-    if response.status_code == 200:
-        return response.json()
+    async def get():
+        started = time.perf_counter()
+        try:
+            response = await client.get(url)
+        except httpx.TransportError:
+            UPSTREAM_SECONDS.labels("owner", "error").observe(time.perf_counter() - started)
+            raise
+        UPSTREAM_SECONDS.labels("owner", str(response.status_code)).observe(time.perf_counter() - started)
+        return response
+
+    for attempt in range(settings.OWNER_FETCH_RETRIES + 1):
+        if not owner_breaker.allow():
+            reason = "circuit open"
+            break
+        try:
+            async with semaphore:
+                response = await hedged(get, settings.UPSTREAM_HEDGE_AFTER)
+
+            if response.status_code not in RETRY_STATUS:
+                owner_breaker.success()
+                if response.status_code != 200:
+                    return None
+                # A garbled body fails this owner only, not the whole gather
+                try:
+                    return response.json()
+                except ValueError:
+                    reason = "invalid JSON body"
+                    break
+            reason = f"HTTP {response.status_code}"
+
+        except httpx.TransportError as e:
+            reason = repr(e)
+
+        owner_breaker.failure()
+        if attempt < settings.OWNER_FETCH_RETRIES:
+            await asyncio.sleep(backoff_delay(settings.OWNER_FETCH_BACKOFF, attempt))
+
+    logger.warning(
+        f"Owner {owner_id} fetch failed: {reason}",
+        extra={"owner_id": owner_id, "rate_key": f"owner-fetch:{owner_id}"},
+    )
+    return UNAVAILABLE
 
-    return None
 
+async def fetch_owners(owner_ids) -> dict:
+    """
+    Fetch many owners concurrently (bounded by OWNER_FETCH_CONCURRENCY).
+    Duplicate IDs are requested once. Returns {owner_id: owner_data or None};
+    owners that could not be fetched are left out, so they are retried later
+    instead of being cached as missing.
+    """
+    unique_ids = list(dict.fromkeys(owner_ids))
+    if not unique_ids:
+        return {}
 
-async def fetch_drones():
-    async with httpx.AsyncClient() as client:
-        response = await client.get(DRONES_LIST_API)
-        response.raise_for_status()
-        return response.json()
+    semaphore = asyncio.Semaphore(settings.OWNER_FETCH_CONCURRENCY)
+    results = await asyncio.gather(
+        *(fetch_owner_async(owner_id, semaphore) for owner_id in unique_ids)
+    )
+    return {
+        owner_id: result
+        for owner_id, result in zip(unique_ids, results)
+        if result is not UNAVAILABLE
+    }
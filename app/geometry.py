@@ -0,0 +1,134 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.zones import ZoneRegistry, default_zones
+
+
+# Used when no registry is passed in: the single 1000-unit circle at the origin
+DEFAULT_REGISTRY = ZoneRegistry(default_zones())
+
+
+@dataclass
+class DroneBatch:
+    """
+    Column-oriented view of one drone list.
+    Only the coordinates needed for classification are copied into arrays;
+    everything else is read from `drones` for the few drones that violate.
+    """
+
+    drones: list
+    x: np.ndarray
+    y: np.ndarray
+    z: np.ndarray
+    malformed: int = 0
+
+    def __len__(self) -> int:
+        return len(self.drones)
+
+
+def drones_to_arrays(drones: list) -> DroneBatch:
+    """
+    Convert the upstream drone list into NumPy coordinate arrays.
+    Malformed entries get NaN coordinates, so they never classify as inside.
+    """
+    n = len(drones)
+
+    # Fast path: every entry is well formed
+    try:
+        x = np.fromiter([d["x"] for d in drones], np.float64, n)
+        y = np.fromiter([d["y"] for d in drones], np.float64, n)
+        z = np.fromiter([d.get("z") or 0 for d in drones], np.float64, n)
+        return DroneBatch(drones=drones, x=x, y=y, z=z)
+    except (KeyError, TypeError, ValueError):
+        pass
+
+    x = np.full(n, np.nan)
+    y = np.full(n, np.nan)
+    z = np.zeros(n)
+    malformed = 0
+    for i, drone in enumerate(drones):
+        try:
+            xi, yi = float(drone["x"]), float(drone["y"])
+            zi = float(drone.get("z") or 0)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            malformed += 1
+            continue
+        x[i] = xi
+        y[i] = yi
+        z[i] = zi
+
+    return DroneBatch(drones=drones, x=x, y=y, z=z, malformed=malformed)
+
+
+def classify_points(x, y, z=None, registry: ZoneRegistry = None) -> np.ndarray:
+    """Return a boolean mask, True where the point lies inside any no-fly zone."""
+    if registry is None:
+        registry = DEFAULT_REGISTRY
+    return registry.classify(x, y, z) >= 0
+
+
+def classify_zones(batch: DroneBatch, registry: ZoneRegistry = None) -> np.ndarray:
+    """Return the index of the zone each drone is in (-1 when outside every zone)."""
+    if registry is None:
+        registry = DEFAULT_REGISTRY
+    return registry.classify(batch.x, batch.y, batch.z)
+
+
+def classify_batch(batch: DroneBatch, registry: ZoneRegistry = None) -> np.ndarray:
+    """Return the indices of the drones in `batch` that are inside a no-fly zone."""
+    return np.flatnonzero(classify_zones(batch, registry) >= 0)
+
+
+def violation_records(batch: DroneBatch, indices) -> list:
+    """
+    Build violation dicts for the given drone indices.
+    Drones without an owner_id are dropped, as they cannot be reported.
+    """
+    records = []
+    for i in np.asarray(indices).tolist():
+        drone = batch.drones[i]
+        owner_id = drone.get("owner_id")
+        if owner_id is None:
+            continue
+
+        records.append({
+            "drone_id": drone.get("id"),
+            "owner_id": str(owner_id),
+            "x": float(batch.x[i]),
+            "y": float(batch.y[i]),
+            "z": float(batch.z[i]),
+        })
+    return records
+
+
+def zone_idx_from_pairs(pairs: list, registry: ZoneRegistry, n: int) -> np.ndarray:
+    """
+    Zone index array from [drone index, zone id] pairs classified elsewhere
+    (shards, the streaming fetch). Zone ids that are no longer in the
+    registry count as outside.
+    """
+    index_of = {zone.zone_id: i for i, zone in enumerate(registry.zones)}
+    zone_idx = np.full(n, -1, dtype=np.int64)
+    for row, zone_id in pairs:
+        zone_idx[row] = index_of.get(zone_id, -1)
+    return zone_idx
+
+
+class ChunkClassifier:
+    """
+    Classifies drone chunks as they are parsed (see fetcher.fetch_drones),
+    collecting [drone index, zone id] for every drone inside a zone.
+    """
+
+    def __init__(self, registry: ZoneRegistry):
+        self.registry = registry
+        self.inside = []
+
+    def __call__(self, drones: list, offset: int):
+        zone_idx = classify_zones(drones_to_arrays(drones), self.registry)
+        zones = self.registry.zones
+        self.inside.extend(
+            [offset + i, zones[zone_idx[i]].zone_id]
+            for i in np.flatnonzero(zone_idx >= 0).tolist()
+        )
@@ -25,11 +25,95 @@
 # logger = setup_logger()
 
 
+import atexit
+import json
 import logging
 import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from app.config import settings
+
+
+# LogRecord attributes that are not caller-supplied `extra` fields
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "rate_key"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, plus any `extra` fields."""
+
+    converter = time.gmtime
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        # QueueHandler has already folded any traceback into the message
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_FIELDS})
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets a record with a `rate_key` extra through at most once per `interval`
+    seconds per key; the next one that passes carries the number suppressed.
+    Records without a key always pass. Runs in the caller's thread, so
+    suppressed events never reach the queue.
+    """
+
+    def __init__(self, interval: float, max_keys: int = 10000):
+        super().__init__()
+        self.interval = interval
+        self.max_keys = max_keys
+        self._seen = OrderedDict()   # key -> [last emitted at, suppressed since]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "rate_key", None)
+        if key is None:
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            seen = self._seen.get(key)
+            if seen is not None and now - seen[0] < self.interval:
+                seen[1] += 1
+                return False
+
+            if seen is not None and seen[1]:
+                record.suppressed = seen[1]
+            self._seen[key] = [now, 0]
+            self._seen.move_to_end(key)
+            while len(self._seen) > self.max_keys:
+                self._seen.popitem(last=False)
+        return True
+
+
+def _make_formatter() -> logging.Formatter:
+    if settings.LOG_FORMAT == "json":
+        return JsonFormatter()
+    return logging.Formatter("%(asctime)s | %(levelname)s | %(name)s | %(message)s")
+
+
+def _start_listener(handler: QueueHandler, sinks: list) -> QueueListener:
+    """Give `handler` a fresh queue drained by a new listener thread."""
+    handler.queue = queue.SimpleQueue()
+    listener = QueueListener(handler.queue, *sinks, respect_handler_level=True)
+    listener.start()
+    return listener
 
 
 def setup_logger(name: str = "airguardian") -> logging.Logger:
+    """
+    Callers only put records on a queue; a listener thread formats them and
+    does the I/O (stderr, and app.log when LOG_TO_FILE=1, rotated by size).
+    """
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
 
@@ -37,24 +121,46 @@ def setup_logger(name: str = "airguardian") -> logging.Logger:
     if logger.handlers:
         return logger
 
-    formatter = logging.Formatter(
-        "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
-    )
+    formatter = _make_formatter()
 
     # ------------------------------------------------------------------
     # Stream (console) handler — Docker-friendly, always enabled
     # ------------------------------------------------------------------
     stream_handler = logging.StreamHandler()
     stream_handler.setFormatter(formatter)
-    logger.addHandler(stream_handler)
+    sinks = [stream_handler]
 
     # ------------------------------------------------------------------
     # Optional file logging — only if LOG_TO_FILE=1
     # ------------------------------------------------------------------
-    if os.getenv("LOG_TO_FILE") == "1":
-        file_handler = logging.FileHandler("app.log")
+    if settings.LOG_TO_FILE == 1:
+        file_handler = RotatingFileHandler(
+            "app.log",
+            maxBytes=settings.LOG_FILE_MAX_BYTES,
+            backupCount=settings.LOG_FILE_BACKUPS,
+        )
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        sinks.append(file_handler)
+
+    # ------------------------------------------------------------------
+    # Queue in front of the sinks, so logging never waits on I/O
+    # ------------------------------------------------------------------
+    queue_handler = QueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(RateLimitFilter(settings.LOG_RATE_LIMIT_SECONDS))
+    logger.addHandler(queue_handler)
+    # Own output only: Celery and uvicorn configure the root logger their own way
+    logger.propagate = False
+
+    listener = _start_listener(queue_handler, sinks)
+
+    def restart_in_child():
+        # The listener thread does not survive fork (Celery prefork workers)
+        nonlocal listener
+        listener = _start_listener(queue_handler, sinks)
+
+    os.register_at_fork(after_in_child=restart_in_child)
+    # Flush what is still queued on exit
+    atexit.register(lambda: listener.stop())
 
     return logger
 
@@ -1,25 +1,38 @@
 from fastapi import FastAPI, Depends, HTTPException, Header, Query
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
-from sqlalchemy.orm import Session, joinedload
-from datetime import datetime, timedelta
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional
 from app.config import settings
 
 import httpx
-import os
+import orjson
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 # --------------------OWN--------------------------------
-from app.fetcher import fetch_drones, fetch_owner
-from app.drone_db import SessionLocal, engine
-from app.schemas import ViolationOut, ViolationInput, OwnerOut
-from app.model import Owner, Violation, Base
-from app.utils import get_db
-from app.tasks import scan_for_violations
+from app.fetcher import close_async_client, upstream_status
+from app.redis_client import close_async_redis, get_async_redis
+from app.snapshot import get_snapshot
+from app.stream import broadcaster, event_stream
+from app.drone_db import engine, async_engine
+from app.migrate import run_migrations
+from app.partitions import maintain_partitions
+from app.utils import get_async_db, get_zone_registry
+from app.geometry import drones_to_arrays, classify_zones, zone_idx_from_pairs
+from app.scan_coordinator import request_scan, scan_status
+from app.sharding import shard_timings
+from app.export import EXPORT_FORMATS, as_utc
+from app.rollups import hourly_counts, top_drones, top_owners
+from app.tracks import drone_track
+from app.prediction import ALERTS_KEY
+from app.violation_queries import decode_cursor, encode_violations, violations_page, window_etag
+from app.violation_window import open_window_page
 from app.logger import logger
+from app.metrics import VIOLATION_PAGES, RequestMetricsMiddleware
 from app.error_handlers import (
 	validation_exception_handler,
 	http_exception_handler,
@@ -47,16 +60,29 @@ app.add_middleware(
 	allow_credentials=True,
 	allow_methods=["*"],
 	allow_headers=["*"],
+	expose_headers=["ETag", "X-Next-Cursor", "X-Has-More", "X-Snapshot-Stale", "X-Snapshot-Age"],
 )
 
+# Latency per route, exported on /metrics
+app.add_middleware(RequestMetricsMiddleware)
+
 # ---------------------------------------------------------
-# Startup: ensure tables exist
+# Startup: migrate schema, make sure today's partitions exist
 # ---------------------------------------------------------
 
 @app.on_event("startup")
 def on_startup():
-	Base.metadata.create_all(bind=engine)
-	print("  🗃️       Tables created.")
+	run_migrations()
+	maintain_partitions(engine)
+	logger.info("Database migrated")
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+	await broadcaster.close()
+	await close_async_client()
+	await close_async_redis()
+	await async_engine.dispose()
 
 
 # ---------------------------------------------------------
@@ -67,6 +93,15 @@ def on_startup():
 def health_check():
 	return {"success": "ok"}
 
+
+# ---------------------------------------------------------
+# Prometheus metrics of this API process
+# ---------------------------------------------------------
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+	return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 logger.info("App starting...")
 
 # ---------------------------------------------------------
@@ -74,71 +109,248 @@ logger.info("App starting...")
 # ---------------------------------------------------------
 
 @app.get("/drones")
-async def proxy_drones(limit: int = Query(10, gt=0, le=100)):
+async def proxy_drones(response: Response, limit: int = Query(10, gt=0, le=100)):
 	try:
-		drones = await fetch_drones()
+		snapshot = await get_snapshot()
 	except httpx.RequestError as exc:
 		raise HTTPException(status_code=502, detail=f"Error contacting drones API: {exc}")
 	except httpx.HTTPStatusError as exc:
-		raise HTTPException(status_code=exc.response.status_code, detail=f"Drones API error: {exc.response.text}")
+		# The body was streamed, not read: only the status is known
+		raise HTTPException(status_code=exc.response.status_code, detail=f"Drones API error: HTTP {exc.response.status_code}")
+
+	# Upstream degraded: these are the last good positions
+	if snapshot.stale:
+		response.headers["X-Snapshot-Stale"] = "true"
+		response.headers["X-Snapshot-Age"] = f"{snapshot.age:.0f}"
 
 	logger.info(f"Returning first {limit} drones")
-	return drones[:limit]
+	return snapshot.drones[:limit]
+
+# ---------------------------------------------------------
+# Position history of one drone
+# ---------------------------------------------------------
+@app.get("/drones/{drone_id}/track")
+async def get_drone_track(
+	drone_id: str,
+	start: Optional[datetime] = Query(None, description="Inclusive, defaults to one hour before end"),
+	end: Optional[datetime] = Query(None, description="Exclusive, defaults to now"),
+	db: AsyncSession = Depends(get_async_db)
+):
+	end = as_utc(end) if end else datetime.now(timezone.utc)
+	start = as_utc(start) if start else end - timedelta(hours=1)
+	if start >= end:
+		raise HTTPException(status_code=400, detail="start must be before end")
+
+	track = await drone_track(db, drone_id, start, end)
+	body = {"drone_id": drone_id, "count": len(track["t"]), **track}
+	return Response(orjson.dumps(body, option=orjson.OPT_SERIALIZE_NUMPY), media_type="application/json")
+
+# ---------------------------------------------------------
+# Live stream (SSE): full state on connect, then deltas
+# ---------------------------------------------------------
+
+@app.get("/stream")
+async def stream_events():
+	return StreamingResponse(
+		event_stream(),
+		media_type="text/event-stream",
+		headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+	)
+
+# ---------------------------------------------------------
+# Predicted incursions from the last scan
+# ---------------------------------------------------------
+
+@app.get("/api/incursion-alerts")
+async def get_incursion_alerts():
+	stored = await get_async_redis().get(ALERTS_KEY)
+	return Response(stored or b'{"ts": null, "alerts": []}', media_type="application/json")
+
+# ---------------------------------------------------------
+# Scan trigger metrics
+# ---------------------------------------------------------
+
+@app.get("/api/scan-status")
+def get_scan_status():
+	# Breaker states are this API process's own
+	return {**scan_status(), "shard_timings": shard_timings(), "upstream": upstream_status()}
 
 # ---------------------------------------------------------
 # Secure NFZ violations endpoint
 # ---------------------------------------------------------
 
+async def violations_response(db: AsyncSession, since: Optional[str], limit: int, if_none_match: Optional[str]):
+	"""
+	One keyset page of the 24h window, oldest first.
+	X-Next-Cursor is passed back as `since` for the next page or for new rows only;
+	an unchanged page answers 304 to a matching If-None-Match.
+	Served from the Redis hot window; Postgres only while it is cold (or Redis is down).
+	"""
+	cursor = decode_cursor(since) if since else None
+
+	client = get_async_redis()
+	page = await open_window_page(client, cursor, limit)
+	if page is not None:
+		if if_none_match == page.etag:
+			return Response(status_code=304, headers={"ETag": page.etag})
+		result = await page.read(client)
+		if result is not None:
+			VIOLATION_PAGES.labels("redis").inc()
+			body, next_cursor, has_more = result
+			return violations_page_response(body, page.etag, next_cursor, has_more)
+
+	VIOLATION_PAGES.labels("postgres").inc()
+
+	etag = await window_etag(db, cursor, limit)
+	if if_none_match == etag:
+		return Response(status_code=304, headers={"ETag": etag})
+
+	violations, next_cursor, has_more = await violations_page(db, cursor, limit)
+
+	return violations_page_response(encode_violations(violations), etag, next_cursor, has_more)
+
+
+def violations_page_response(body: bytes, etag: str, next_cursor: Optional[str], has_more: bool) -> Response:
+	headers = {"ETag": etag, "X-Has-More": str(has_more).lower()}
+	if next_cursor:
+		headers["X-Next-Cursor"] = next_cursor
+
+	return Response(body, media_type="application/json", headers=headers)
+
+
 @app.get("/nfz")
-def get_violations(
+async def get_violations(
 	x_secret: str = Header(...),
-	db: Session = Depends(get_db)
+	since: Optional[str] = Query(None, description="Cursor from X-Next-Cursor"),
+	limit: int = Query(1000, gt=0, le=10000),
+	if_none_match: Optional[str] = Header(None),
+	db: AsyncSession = Depends(get_async_db)
 ):
 	if x_secret != X_SECRET:
 		raise HTTPException(status_code=401, detail="Unauthorized")
 
- # 🔁 Trigger background scan before returning results
-	scan_for_violations.delay()
-
-	since = datetime.utcnow() - timedelta(hours=24)
-	violations = (
-		db.query(Violation)
-		.filter(Violation.timestamp >= since)
-		.options(joinedload(Violation.owner))
-		.all()
-	)
+ # 🔁 Trigger background scan before returning results (coalesced)
+	await run_in_threadpool(request_scan, "nfz")
 
-	return [ViolationOut.from_orm(v) for v in violations]
+	return await violations_response(db, since, limit, if_none_match)
 
 
 # ---------------------------------------------------------
 # Frontend-safe NFZ: does NOT expose secret to browser
 # ---------------------------------------------------------
 @app.get("/frontend-nfz")
-def frontend_proxy_nfz(db: Session = Depends(get_db)):
+async def frontend_proxy_nfz(
+	since: Optional[str] = Query(None, description="Cursor from X-Next-Cursor"),
+	limit: int = Query(1000, gt=0, le=10000),
+	if_none_match: Optional[str] = Header(None),
+	db: AsyncSession = Depends(get_async_db)
+):
 	# This does NOT expose the secret to the client
 	if X_SECRET is None:
 		raise HTTPException(status_code=500, detail="Missing secret key")
 
 	# Internally call the protected route
-	scan_for_violations.delay()
-	since = datetime.utcnow() - timedelta(hours=24)
-	violations = (
-		db.query(Violation)
-		.filter(Violation.timestamp >= since)
-		.options(joinedload(Violation.owner))
-		.all()
+	await run_in_threadpool(request_scan, "frontend-nfz")
+
+	return await violations_response(db, since, limit, if_none_match)
+
+# ---------------------------------------------------------
+# Violation history export (streamed, any time range)
+# ---------------------------------------------------------
+@app.get("/nfz/export")
+async def export_violations(
+	start: datetime = Query(..., description="Inclusive, ISO 8601 (UTC if no offset)"),
+	end: Optional[datetime] = Query(None, description="Exclusive, defaults to now"),
+	format: Literal["ndjson", "csv"] = Query("ndjson"),
+	x_secret: str = Header(...),
+):
+	if x_secret != X_SECRET:
+		raise HTTPException(status_code=401, detail="Unauthorized")
+
+	start = as_utc(start)
+	end = as_utc(end) if end else datetime.now(timezone.utc)
+	if start >= end:
+		raise HTTPException(status_code=400, detail="start must be before end")
+
+	exporter, media_type = EXPORT_FORMATS[format]
+	filename = f"violations_{start:%Y%m%dT%H%M%S}_{end:%Y%m%dT%H%M%S}.{format}"
+	return StreamingResponse(
+		exporter(start, end),
+		media_type=media_type,
+		headers={"Content-Disposition": f'attachment; filename="{filename}"'},
 	)
-	return [ViolationOut.from_orm(v) for v in violations]
+
+# ---------------------------------------------------------
+# Violation stats, read from the rollup tables
+# ---------------------------------------------------------
+@app.get("/stats/owners")
+async def stats_top_owners(
+	limit: int = Query(10, gt=0, le=1000),
+	db: AsyncSession = Depends(get_async_db)
+):
+	return await top_owners(db, limit)
+
+
+@app.get("/stats/drones")
+async def stats_top_drones(
+	limit: int = Query(10, gt=0, le=1000),
+	min_count: int = Query(1, ge=1, description="2 or more lists repeat offenders"),
+	db: AsyncSession = Depends(get_async_db)
+):
+	return await top_drones(db, limit, min_count)
+
+
+@app.get("/stats/hourly")
+async def stats_hourly(
+	hours: int = Query(24, gt=0, le=24 * 90),
+	db: AsyncSession = Depends(get_async_db)
+):
+	return await hourly_counts(db, hours)
 
 # ---------------------------------------------------------
 # Map data
 # ---------------------------------------------------------
+# Encoded map payload of the last snapshot, so classification and JSON
+# encoding run once per snapshot rather than once per request
+_map_data_cache = {"key": None, "body": None}
+
+
 @app.get("/api/map-data")
 async def get_map_data():
 	try:
-		drones = await fetch_drones()
+		snapshot = await get_snapshot()
 	except Exception as e:
 		raise HTTPException(status_code=502, detail=f"Failed to fetch drones: {str(e)}")
-	
-	return {"drones": drones, "nfz_radius": 1000}
+
+	key = (snapshot.version, snapshot.fetched_at, snapshot.stale)
+	if _map_data_cache["key"] == key:
+		return Response(_map_data_cache["body"], media_type="application/json")
+
+	# Zone lookup (may query the DB) and encoding are kept off the event loop
+	body = await run_in_threadpool(encode_map_data, snapshot)
+	_map_data_cache.update(key=key, body=body)
+	return Response(body, media_type="application/json")
+
+
+def encode_map_data(snapshot) -> bytes:
+	registry = get_zone_registry()
+	if snapshot.inside is None:
+		in_nfz = classify_zones(drones_to_arrays(snapshot.drones), registry) >= 0
+	else:
+		in_nfz = zone_idx_from_pairs(snapshot.inside, registry, len(snapshot.drones)) >= 0
+	drones = [
+		{**drone, "in_nfz": flag}
+		for drone, flag in zip(snapshot.drones, in_nfz.tolist())
+	]
+
+	# nfz_radius is kept for older clients that only draw the default circle
+	payload = {
+		"drones": drones,
+		"zones": registry.to_list(),
+		"nfz_radius": 1000,
+		"version": snapshot.version,
+		"fetched_at": snapshot.fetched_at,
+		# Upstream degraded: the last good positions, fetched_at tells how old
+		"stale": snapshot.stale,
+	}
+	return orjson.dumps(payload)
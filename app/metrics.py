@@ -0,0 +1,187 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import redis
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
+
+from app.drone_db import async_engine, engine
+from app.redis_client import redis_client
+from app.scan_coordinator import SCHEDULE_KEY
+
+
+# Scans take from milliseconds (cached snapshot, nothing new) to tens of seconds
+SCAN_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+# ---------------------------------------------------------
+# Scan pipeline
+# ---------------------------------------------------------
+
+SCAN_STAGE_SECONDS = Histogram(
+    "airguardian_scan_stage_seconds",
+    "Time per scan stage: fetch (waiting on the upstream), parse, classify, owners, persist",
+    ["stage"],
+    buckets=SCAN_BUCKETS,
+)
+SCAN_SECONDS = Histogram(
+    "airguardian_scan_seconds",
+    "Duration of a whole scan",
+    buckets=SCAN_BUCKETS,
+)
+SCANS = Counter("airguardian_scans", "Scans run, by outcome", ["outcome"])
+SCAN_DRONES = Gauge("airguardian_scan_drones", "Well-formed drones in the last scan")
+SCAN_INSIDE = Gauge("airguardian_scan_inside", "Drones inside a zone in the last scan")
+SCAN_APPROACHING = Gauge("airguardian_scan_approaching", "Drones predicted to enter a zone in the last scan")
+VIOLATIONS = Counter("airguardian_violations", "Violations recorded (episodes opened)")
+EPISODES_CLOSED = Counter("airguardian_episodes_closed", "Violation episodes closed")
+
+
+class ScanScheduleCollector:
+    """
+    The adaptive scan interval and its cause (inside, approaching, quiet, empty,
+    failed, budget), read from Redis when scraped: any worker process may have
+    chosen it, so a per-process gauge would go stale.
+    """
+
+    def _family(self):
+        return GaugeMetricFamily(
+            "airguardian_scan_interval_seconds",
+            "Interval until the next scheduled scan, chosen after the last one, by cause",
+            labels=["cause"],
+        )
+
+    def describe(self):
+        yield self._family()
+
+    def collect(self):
+        try:
+            schedule = redis_client.hgetall(SCHEDULE_KEY)
+        except redis.RedisError:
+            return
+        if b"interval" not in schedule:
+            return
+        family = self._family()
+        family.add_metric([schedule.get(b"cause", b"unknown").decode()], float(schedule[b"interval"]))
+        yield family
+
+
+REGISTRY.register(ScanScheduleCollector())
+
+# ---------------------------------------------------------
+# Upstream APIs
+# ---------------------------------------------------------
+
+UPSTREAM_SECONDS = Histogram(
+    "airguardian_upstream_request_seconds",
+    "Upstream request latency (the drone list until its last byte)",
+    ["api", "status"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+UPSTREAM_BREAKER_OPEN = Gauge("airguardian_upstream_breaker_open", "1 while the API's circuit breaker is open", ["api"])
+UPSTREAM_HEDGES = Counter("airguardian_upstream_hedges", "Second requests sent because the first was slow")
+SNAPSHOT_STALE_SERVED = Counter(
+    "airguardian_snapshot_stale_served",
+    "Times the last good drone snapshot was served because the upstream failed",
+)
+
+# ---------------------------------------------------------
+# HTTP API
+# ---------------------------------------------------------
+
+REQUEST_SECONDS = Histogram(
+    "airguardian_http_request_seconds",
+    "API latency per route, until the response starts",
+    ["method", "route", "status"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+VIOLATION_PAGES = Counter("airguardian_violation_pages", "/nfz pages served, by source (redis window or postgres)", ["source"])
+
+# ---------------------------------------------------------
+# Celery tasks (worker processes)
+# ---------------------------------------------------------
+
+TASK_SECONDS = Histogram("airguardian_task_seconds", "Celery task run time", ["task"], buckets=SCAN_BUCKETS)
+TASKS = Counter("airguardian_tasks", "Celery tasks finished, by state", ["task", "state"])
+
+# ---------------------------------------------------------
+# DB connection pools, read when scraped
+# ---------------------------------------------------------
+
+DB_POOL = Gauge("airguardian_db_pool_connections", "DB pool connections", ["pool", "state"])
+
+for _name, _pool in (("sync", engine.pool), ("async", async_engine.pool)):
+    # Not every pool class (e.g. SQLite's) has a size
+    if hasattr(_pool, "size"):
+        DB_POOL.labels(_name, "checked_out").set_function(_pool.checkedout)
+        DB_POOL.labels(_name, "idle").set_function(_pool.checkedin)
+        DB_POOL.labels(_name, "overflow").set_function(lambda pool=_pool: max(pool.overflow(), 0))
+        DB_POOL.labels(_name, "size").set_function(_pool.size)
+
+
+# Seconds spent in stages nested inside the current one
+_nested = ContextVar("scan_stage_nested", default=None)
+
+
+@contextmanager
+def scan_stage(stage: str):
+    """
+    Time a block as one scan stage. Stages may nest (persisting violations
+    resolves their owners first); the inner time only counts for the inner stage.
+    """
+    parent = _nested.get()
+    inner = [0.0]
+    token = _nested.set(inner)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _nested.reset(token)
+        if parent is not None:
+            parent[0] += elapsed
+        SCAN_STAGE_SECONDS.labels(stage).observe(elapsed - inner[0])
+
+
+def record_scan(drones: int, inside: int, approaching: int, episodes: dict):
+    SCAN_DRONES.set(drones)
+    SCAN_INSIDE.set(inside)
+    SCAN_APPROACHING.set(approaching)
+    if episodes:
+        VIOLATIONS.inc(episodes["opened"])
+        EPISODES_CLOSED.inc(episodes["closed"])
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware observing REQUEST_SECONDS, labelled by route template rather than path."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        observed = False
+
+        def observe(status: int):
+            nonlocal observed
+            observed = True
+            # Set by the router once matched; unknown paths share one label
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            REQUEST_SECONDS.labels(scope["method"], path, str(status)).observe(time.perf_counter() - started)
+
+        async def send_observed(message):
+            if message["type"] == "http.response.start":
+                observe(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_observed)
+        finally:
+            if not observed:
+                observe(500)
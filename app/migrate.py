@@ -0,0 +1,20 @@
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Postgres advisory lock serializing schema changes: `upgrade` runs (e.g.
+# several backend replicas starting) and partition maintenance
+MIGRATION_LOCK_ID = 7_310_451
+
+
+def run_migrations(revision: str = "head"):
+    """Upgrade the database schema (same as `alembic upgrade head`)."""
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "migrations"))
+    # Keep the app's logging setup instead of alembic.ini's
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, revision)
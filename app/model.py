@@ -34,7 +34,11 @@ from sqlalchemy import (
     String,
     DateTime,
     Float,
-    ForeignKey
+    ForeignKey,
+    Boolean,
+    Text,
+    Index,
+    LargeBinary
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
@@ -66,7 +70,15 @@ class Owner(Base):
 class Violation(Base):
     __tablename__ = "violations"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # Partitioned by day on timestamp (see migrations and app.partitions),
+    # so timestamp has to be part of the primary key
+    __table_args__ = (
+        Index("ix_violations_timestamp_id", "timestamp", "id"),
+        Index("ix_violations_owner_id", "owner_id"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
     drone_id = Column(String(100))
     owner_id = Column(String, ForeignKey("owners.id"))
     x = Column(Float)
@@ -75,6 +87,7 @@ class Violation(Base):
 
     timestamp = Column(
         DateTime(timezone=True),
+        primary_key=True,
         default=lambda: datetime.now(timezone.utc)
     )
 
@@ -82,3 +95,121 @@ class Violation(Base):
         "Owner",
         back_populates="violations"
     )
+
+
+class NoFlyZone(Base):
+    __tablename__ = "no_fly_zones"
+
+    id = Column(String(100), primary_key=True)
+    name = Column(String(200), nullable=True)
+
+    # "circle" or "polygon"
+    kind = Column(String(20), nullable=False, default="circle")
+
+    # JSON geometry: {"center": [x, y], "radius": r} or {"points": [[x, y], ...]}
+    geometry = Column(Text, nullable=False)
+
+    # Optional altitude band
+    min_alt = Column(Float, nullable=True)
+    max_alt = Column(Float, nullable=True)
+
+    active = Column(Boolean, nullable=False, default=True)
+
+
+class ViolationEpisode(Base):
+    """
+    One continuous incursion of a drone into a no-fly zone.
+    Written when it opens and updated once when it closes; the scans in
+    between only update the open-episode state in Redis.
+    """
+
+    __tablename__ = "violation_episodes"
+
+    __table_args__ = (
+        Index("ix_violation_episodes_drone_id", "drone_id"),
+        Index("ix_violation_episodes_opened_at", "opened_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    drone_id = Column(String(100), nullable=False)
+    owner_id = Column(String, ForeignKey("owners.id"))
+    zone_id = Column(String(100))
+
+    opened_at = Column(DateTime(timezone=True), nullable=False)
+    last_seen_at = Column(DateTime(timezone=True), nullable=False)
+    closed_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Closest approach to the zone's center during the episode
+    closest_distance = Column(Float)
+    closest_x = Column(Float)
+    closest_y = Column(Float)
+    closest_z = Column(Float)
+
+    sample_count = Column(Integer, nullable=False, default=1)
+
+    owner = relationship("Owner")
+
+
+# ---------------------------------------------------------
+# Rollups: kept up to date with every violation insert (app.rollups)
+# ---------------------------------------------------------
+
+class OwnerViolationStats(Base):
+    __tablename__ = "violation_stats_owner"
+
+    __table_args__ = (
+        Index("ix_violation_stats_owner_count", "violation_count"),
+    )
+
+    owner_id = Column(String, ForeignKey("owners.id"), primary_key=True)
+    violation_count = Column(Integer, nullable=False, default=0)
+    first_at = Column(DateTime(timezone=True), nullable=False)
+    last_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class DroneViolationStats(Base):
+    __tablename__ = "violation_stats_drone"
+
+    __table_args__ = (
+        Index("ix_violation_stats_drone_count", "violation_count"),
+    )
+
+    drone_id = Column(String(100), primary_key=True)
+    owner_id = Column(String, ForeignKey("owners.id"))
+    violation_count = Column(Integer, nullable=False, default=0)
+    first_at = Column(DateTime(timezone=True), nullable=False)
+    last_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class HourlyViolationStats(Base):
+    __tablename__ = "violation_stats_hourly"
+
+    # Start of the UTC hour
+    hour = Column(DateTime(timezone=True), primary_key=True)
+    violation_count = Column(Integer, nullable=False, default=0)
+
+
+class DroneTrack(Base):
+    """
+    A chunk of one drone's position history, flushed from a worker's
+    TrackBuffer (app.tracks). Columns are packed arrays: t as float64
+    epoch seconds, x/y/z as float32, all little-endian, sample_count long.
+    """
+
+    __tablename__ = "drone_tracks"
+
+    __table_args__ = (
+        Index("ix_drone_tracks_drone_id_start_at", "drone_id", "start_at"),
+        Index("ix_drone_tracks_end_at", "end_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    drone_id = Column(String(100), nullable=False)
+    start_at = Column(DateTime(timezone=True), nullable=False)
+    end_at = Column(DateTime(timezone=True), nullable=False)
+    sample_count = Column(Integer, nullable=False)
+
+    t = Column(LargeBinary, nullable=False)
+    x = Column(LargeBinary, nullable=False)
+    y = Column(LargeBinary, nullable=False)
+    z = Column(LargeBinary, nullable=False)
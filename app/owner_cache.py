@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+
+from app.config import settings
+from app.logger import logger
+from app.redis_client import redis_client
+
+
+# Marker for "owner does not exist" (negative cache entry)
+_NEGATIVE = b"__none__"
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (hit, value). Expired entries count as misses."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return False, None
+
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, ttl: float):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class OwnerCache:
+    """
+    Two-level owner cache: in-process LRU in front of Redis.
+    Values are owner dicts; None means "owner does not exist" (negative entry).
+    Only owners that are stored in the DB (or known not to exist) should be cached.
+    """
+
+    KEY_PREFIX = "airguardian:owner:"
+
+    def __init__(self, client, max_size: int, ttl: float, redis_ttl: int, negative_ttl: int):
+        self.redis = client
+        self.local = LRUCache(max_size)
+        self.ttl = ttl
+        self.redis_ttl = redis_ttl
+        self.negative_ttl = negative_ttl
+        self.stats = {
+            "local_hits": 0,
+            "redis_hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+        }
+
+    def get_many(self, owner_ids) -> tuple:
+        """
+        Look up owners in both levels.
+        Returns (found, missing): found maps owner_id -> dict or None (negative),
+        missing is the set of IDs in neither level.
+        """
+        found = {}
+        remote = []
+
+        for owner_id in owner_ids:
+            hit, value = self.local.get(owner_id)
+            if hit:
+                self.stats["local_hits"] += 1
+                found[owner_id] = value
+            else:
+                remote.append(owner_id)
+
+        if remote:
+            try:
+                raw_values = self.redis.mget([self.KEY_PREFIX + owner_id for owner_id in remote])
+            except redis.RedisError as e:
+                logger.warning(f"Owner cache: Redis unavailable ({e})")
+                raw_values = [None] * len(remote)
+
+            for owner_id, raw in zip(remote, raw_values):
+                if raw is None:
+                    continue
+                value = None if raw == _NEGATIVE else json.loads(raw)
+                self.stats["redis_hits"] += 1
+                self.local.set(owner_id, value, self._local_ttl(value))
+                found[owner_id] = value
+
+        for value in found.values():
+            if value is None:
+                self.stats["negative_hits"] += 1
+
+        missing = set(owner_ids) - found.keys()
+        self.stats["misses"] += len(missing)
+        return found, missing
+
+    def set_many(self, owners: dict):
+        """Store owners in both levels; a None value is cached as a negative entry."""
+        if not owners:
+            return
+
+        for owner_id, value in owners.items():
+            self.local.set(owner_id, value, self._local_ttl(value))
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for owner_id, value in owners.items():
+                if value is None:
+                    pipe.set(self.KEY_PREFIX + owner_id, _NEGATIVE, ex=self.negative_ttl)
+                else:
+                    pipe.set(self.KEY_PREFIX + owner_id, json.dumps(value), ex=self.redis_ttl)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Owner cache: Redis unavailable ({e})")
+
+    def _local_ttl(self, value) -> float:
+        return self.negative_ttl if value is None else self.ttl
+
+
+owner_cache = OwnerCache(
+    redis_client,
+    max_size=settings.OWNER_CACHE_SIZE,
+    ttl=settings.OWNER_CACHE_TTL,
+    redis_ttl=settings.OWNER_CACHE_REDIS_TTL,
+    negative_ttl=settings.OWNER_CACHE_NEGATIVE_TTL,
+)
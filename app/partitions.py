@@ -0,0 +1,133 @@
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.config import settings
+from app.logger import logger
+from app.migrate import MIGRATION_LOCK_ID
+
+
+PARENT_TABLE = "violations"
+DEFAULT_PARTITION = "violations_default"
+PARTITION_PREFIX = "violations_p"
+
+
+def partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def _day_bounds(day: date) -> tuple:
+    lower = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    return lower, lower + timedelta(days=1)
+
+
+def existing_partitions(conn: Connection) -> dict:
+    """Return {day: partition name} for the daily partitions of violations."""
+    names = conn.execute(text(
+        """
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :parent
+        """
+    ), {"parent": PARENT_TABLE}).scalars()
+
+    partitions = {}
+    for name in names:
+        if not name.startswith(PARTITION_PREFIX):
+            continue
+        try:
+            partitions[datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m%d").date()] = name
+        except ValueError:
+            continue
+    return partitions
+
+
+def create_partition(conn: Connection, day: date):
+    """
+    Create the partition for one day. Rows that already landed in the default
+    partition for that day are moved into it (Postgres refuses otherwise).
+    """
+    name = partition_name(day)
+    lower, upper = _day_bounds(day)
+    params = {"lower": lower, "upper": upper}
+
+    conn.execute(text(
+        f"""
+        CREATE TEMP TABLE _moved_violations ON COMMIT DROP AS
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION}
+            WHERE timestamp >= :lower AND timestamp < :upper
+            RETURNING *
+        )
+        SELECT * FROM moved
+        """
+    ), params)
+
+    conn.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+    ))
+
+    conn.execute(text(f"INSERT INTO {PARENT_TABLE} SELECT * FROM _moved_violations"))
+    conn.execute(text("DROP TABLE _moved_violations"))
+
+
+def ensure_partitions(conn: Connection, start: date, end: date) -> list:
+    """Create the missing daily partitions for every day in [start, end]."""
+    existing = existing_partitions(conn)
+    created = []
+
+    day = start
+    while day <= end:
+        if day not in existing:
+            create_partition(conn, day)
+            created.append(partition_name(day))
+        day += timedelta(days=1)
+
+    return created
+
+
+def drop_old_partitions(conn: Connection, retention_days: int) -> list:
+    """Drop daily partitions entirely older than the retention period."""
+    cutoff = datetime.now(timezone.utc).date() - timedelta(days=retention_days)
+    dropped = []
+
+    for day, name in sorted(existing_partitions(conn).items()):
+        if day < cutoff:
+            conn.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+
+    # Stray rows in the default partition follow the same retention
+    lower, _ = _day_bounds(cutoff)
+    conn.execute(
+        text(f"DELETE FROM {DEFAULT_PARTITION} WHERE timestamp < :cutoff"),
+        {"cutoff": lower},
+    )
+
+    return dropped
+
+
+def maintain_partitions(engine: Engine) -> dict:
+    """
+    Create partitions VIOLATION_PARTITIONS_AHEAD days ahead and drop the ones
+    older than VIOLATION_RETENTION_DAYS. No-op on databases other than Postgres.
+    Holds the migration lock for the transaction, so API replicas starting up,
+    the beat task and `upgrade` never create or move partitions at the same time.
+    """
+    if engine.dialect.name != "postgresql":
+        return {"created": [], "dropped": []}
+
+    today = datetime.now(timezone.utc).date()
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        created = ensure_partitions(
+            conn, today, today + timedelta(days=settings.VIOLATION_PARTITIONS_AHEAD)
+        )
+        dropped = drop_old_partitions(conn, settings.VIOLATION_RETENTION_DAYS)
+
+    if created or dropped:
+        logger.info(f"Violation partitions: created {created}, dropped {dropped}")
+    return {"created": created, "dropped": dropped}
@@ -0,0 +1,148 @@
+import json
+import math
+
+import numpy as np
+
+from app.config import settings
+from app.redis_client import redis_client
+
+
+# Positions of the previous snapshot: {"ts", "ids"} + packed float64 x/y/z
+PREVIOUS_KEY = "airguardian:predict:previous"
+# Latest list of imminent incursions, served by /api/incursion-alerts
+ALERTS_KEY = "airguardian:predict:alerts"
+
+# Bisection rounds used to narrow an entry time down inside one step
+REFINE_ROUNDS = 6
+
+
+def _drone_ids(batch, rows: np.ndarray) -> list:
+    drones = batch.drones
+    return [str(drones[i].get("id")) for i in rows.tolist()]
+
+
+def _load_previous():
+    stored = redis_client.hgetall(PREVIOUS_KEY)
+    if not stored:
+        return None
+    meta = json.loads(stored[b"meta"])
+    xyz = np.frombuffer(stored[b"xyz"], dtype=np.float64).reshape(3, -1)
+    return meta["ts"], meta["ids"], xyz
+
+
+def _store_current(timestamp: float, ids: list, x, y, z):
+    redis_client.hset(PREVIOUS_KEY, mapping={
+        "meta": json.dumps({"ts": timestamp, "ids": ids}),
+        "xyz": np.vstack([x, y, z]).astype(np.float64).tobytes(),
+    })
+
+
+def estimate_velocity(ids: list, x, y, z, timestamp: float, previous) -> tuple:
+    """
+    Per-drone velocity from the previous snapshot, matched by drone id.
+    Returns (vx, vy, vz, known); known is False for drones without a usable
+    previous position (new drone, or the previous snapshot is too old).
+    """
+    n = len(ids)
+    zeros = np.zeros(n)
+    if previous is None:
+        return zeros, zeros, zeros, np.zeros(n, dtype=bool)
+
+    prev_ts, prev_ids, prev_xyz = previous
+    dt = timestamp - prev_ts
+    if not 0 < dt <= settings.PREDICT_MAX_GAP:
+        return zeros, zeros, zeros, np.zeros(n, dtype=bool)
+
+    position = {drone_id: i for i, drone_id in enumerate(prev_ids)}
+    match = np.fromiter((position.get(drone_id, -1) for drone_id in ids), dtype=np.int64, count=n)
+    known = match >= 0
+    match = np.where(known, match, 0)
+
+    vx = np.where(known, (x - prev_xyz[0][match]) / dt, 0.0)
+    vy = np.where(known, (y - prev_xyz[1][match]) / dt, 0.0)
+    vz = np.where(known, (z - prev_xyz[2][match]) / dt, 0.0)
+    return vx, vy, vz, known
+
+
+def time_to_entry(registry, x, y, z, vx, vy, vz, candidates: np.ndarray) -> tuple:
+    """
+    Extrapolate the candidates linearly over PREDICT_HORIZON seconds and return
+    (eta, zone index) arrays for all drones: inf / -1 where no zone is reached.
+    Every step classifies all remaining candidates at once through the zone
+    index; a hit is then refined by bisection within its step.
+    """
+    eta = np.full(len(x), np.inf)
+    entered = np.full(len(x), -1, dtype=np.int64)
+    step = settings.PREDICT_STEP
+
+    def classify_at(rows, t):
+        return registry.classify(x[rows] + vx[rows] * t, y[rows] + vy[rows] * t, z[rows] + vz[rows] * t)
+
+    remaining = candidates
+    for k in range(1, math.ceil(settings.PREDICT_HORIZON / step) + 1):
+        if not len(remaining):
+            break
+        t = min(k * step, settings.PREDICT_HORIZON)
+        zone = classify_at(remaining, t)
+        hit = zone >= 0
+        if not hit.any():
+            continue
+
+        rows = remaining[hit]
+        lo = np.full(len(rows), t - step)
+        hi = np.full(len(rows), t)
+        zone = zone[hit]
+        for _ in range(REFINE_ROUNDS):
+            mid = (lo + hi) / 2
+            mid_zone = classify_at(rows, mid)
+            inside = mid_zone >= 0
+            hi = np.where(inside, mid, hi)
+            lo = np.where(inside, lo, mid)
+            zone = np.where(inside, mid_zone, zone)
+
+        eta[rows] = hi
+        entered[rows] = zone
+        remaining = remaining[~hit]
+
+    return eta, entered
+
+
+def predict_incursions(batch, zone_idx: np.ndarray, registry, timestamp: float) -> list:
+    """
+    Flag drones outside every zone that, at their current velocity, enter one
+    within PREDICT_HORIZON seconds. Velocities come from the previous snapshot,
+    so this needs no extra upstream requests. Returns alerts, soonest first,
+    and stores them (and this snapshot's positions) in Redis.
+    """
+    valid = np.flatnonzero(~np.isnan(batch.x))
+    ids = _drone_ids(batch, valid)
+    x, y, z = batch.x[valid], batch.y[valid], batch.z[valid]
+
+    previous = _load_previous()
+    if previous is not None and previous[0] == timestamp:
+        # Same snapshot scanned again: nothing moved, keep the last alerts
+        stored = redis_client.get(ALERTS_KEY)
+        return json.loads(stored)["alerts"] if stored else []
+
+    vx, vy, vz, known = estimate_velocity(ids, x, y, z, timestamp, previous)
+    speed = np.sqrt(vx * vx + vy * vy + vz * vz)
+    candidates = np.flatnonzero(known & (zone_idx[valid] < 0) & (speed >= settings.PREDICT_MIN_SPEED))
+    eta, entered = time_to_entry(registry, x, y, z, vx, vy, vz, candidates)
+
+    alerts = []
+    for i in np.flatnonzero(np.isfinite(eta)).tolist():
+        drone = batch.drones[valid[i]]
+        owner_id = drone.get("owner_id")
+        alerts.append({
+            "drone_id": drone.get("id"),
+            "owner_id": None if owner_id is None else str(owner_id),
+            "zone_id": registry.zones[entered[i]].zone_id,
+            "eta": round(float(eta[i]), 2),
+            "position": [float(x[i]), float(y[i]), float(z[i])],
+            "velocity": [float(vx[i]), float(vy[i]), float(vz[i])],
+        })
+    alerts.sort(key=lambda alert: alert["eta"])
+
+    _store_current(timestamp, ids, x, y, z)
+    redis_client.set(ALERTS_KEY, json.dumps({"ts": timestamp, "alerts": alerts}))
+    return alerts
@@ -0,0 +1,42 @@
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from app.config import settings
+from app.logger import logger
+
+
+@contextmanager
+def profile_scan(name: str = "scan"):
+    """
+    Sample the block with pyinstrument when SCAN_PROFILE is on, and save a
+    speedscope flamegraph (open at https://www.speedscope.app) to
+    SCAN_PROFILE_DIR if it took at least SCAN_PROFILE_MIN_SECONDS.
+    Off by default; pyinstrument is the optional `profiling` extra.
+    """
+    if not settings.SCAN_PROFILE:
+        yield
+        return
+
+    try:
+        from pyinstrument import Profiler
+        from pyinstrument.renderers import SpeedscopeRenderer
+    except ImportError:
+        logger.warning("SCAN_PROFILE is set but pyinstrument is not installed")
+        yield
+        return
+
+    profiler = Profiler(interval=settings.SCAN_PROFILE_INTERVAL, async_mode="disabled")
+    profiler.start()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        elapsed = time.perf_counter() - started
+        if elapsed >= settings.SCAN_PROFILE_MIN_SECONDS:
+            directory = Path(settings.SCAN_PROFILE_DIR)
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / f"{name}-{time.strftime('%Y%m%dT%H%M%S')}-{elapsed:.2f}s.speedscope.json"
+            path.write_text(profiler.output(renderer=SpeedscopeRenderer()))
+            logger.info(f"Profile of a {elapsed:.2f}s {name} saved to {path}")
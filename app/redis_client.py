@@ -0,0 +1,31 @@
+import asyncio
+import weakref
+
+import redis
+import redis.asyncio
+
+from app.config import settings
+
+
+# Shared Redis connection pool (same instance Celery uses as broker)
+redis_client = redis.Redis.from_url(settings.REDIS_URL)
+
+# One asyncio client per event loop (connections are bound to their loop)
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_redis() -> redis.asyncio.Redis:
+    """Return the asyncio Redis client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = redis.asyncio.Redis.from_url(settings.REDIS_URL)
+        _async_clients[loop] = client
+    return client
+
+
+async def close_async_redis():
+    """Close the asyncio client of the running event loop (app shutdown)."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,123 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.model import DroneViolationStats, HourlyViolationStats, OwnerViolationStats
+
+
+def _hour(ts: datetime) -> datetime:
+    return ts.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _aggregate(rows: list, key) -> dict:
+    """key -> [count, first_at, last_at, owner_id of the latest row]"""
+    groups = {}
+    for row in rows:
+        group = groups.get(key(row))
+        if group is None:
+            groups[key(row)] = [1, row["timestamp"], row["timestamp"], row["owner_id"]]
+            continue
+        group[0] += 1
+        group[1] = min(group[1], row["timestamp"])
+        if row["timestamp"] >= group[2]:
+            group[2] = row["timestamp"]
+            group[3] = row["owner_id"]
+    return groups
+
+
+def _upsert_counts(db: Session, model, key_column: str, values: list, extra: tuple = ()):
+    """Add the counts in `values` to the rollup rows, creating them as needed."""
+    stmt = insert(model).values(values)
+    table = model.__table__
+    update = {"violation_count": table.c.violation_count + stmt.excluded.violation_count}
+    if "first_at" in table.c:
+        update["first_at"] = func.least(table.c.first_at, stmt.excluded.first_at)
+        update["last_at"] = func.greatest(table.c.last_at, stmt.excluded.last_at)
+    for column in extra:
+        update[column] = stmt.excluded[column]
+    db.execute(stmt.on_conflict_do_update(index_elements=[key_column], set_=update))
+
+
+def update_rollups(rows: list, db: Session):
+    """
+    Fold freshly inserted violation rows (drone_id, owner_id, timestamp) into
+    the per-owner, per-drone and per-hour rollups, one upsert per table.
+    Runs in the caller's transaction; keys are sorted so concurrent writers
+    lock rows in the same order.
+    """
+    if not rows:
+        return
+
+    owners = _aggregate(rows, lambda row: row["owner_id"])
+    _upsert_counts(db, OwnerViolationStats, "owner_id", [
+        {"owner_id": owner_id, "violation_count": count, "first_at": first, "last_at": last}
+        for owner_id, (count, first, last, _) in sorted(owners.items())
+    ])
+
+    drones = _aggregate(rows, lambda row: str(row["drone_id"]))
+    _upsert_counts(db, DroneViolationStats, "drone_id", [
+        {"drone_id": drone_id, "owner_id": owner_id, "violation_count": count, "first_at": first, "last_at": last}
+        for drone_id, (count, first, last, owner_id) in sorted(drones.items())
+    ], extra=("owner_id",))
+
+    hours = Counter(_hour(row["timestamp"]) for row in rows)
+    _upsert_counts(db, HourlyViolationStats, "hour", [
+        {"hour": hour, "violation_count": count}
+        for hour, count in sorted(hours.items())
+    ])
+
+
+# ---------------------------------------------------------
+# Reads for /stats: primary key or index lookups only
+# ---------------------------------------------------------
+
+def _stats_dict(row) -> dict:
+    return dict(row._mapping)
+
+
+async def top_owners(db: AsyncSession, limit: int) -> list:
+    rows = await db.execute(
+        select(
+            OwnerViolationStats.owner_id,
+            OwnerViolationStats.violation_count,
+            OwnerViolationStats.first_at,
+            OwnerViolationStats.last_at,
+        )
+        .order_by(OwnerViolationStats.violation_count.desc())
+        .limit(limit)
+    )
+    return [_stats_dict(row) for row in rows]
+
+
+async def top_drones(db: AsyncSession, limit: int, min_count: int = 1) -> list:
+    rows = await db.execute(
+        select(
+            DroneViolationStats.drone_id,
+            DroneViolationStats.owner_id,
+            DroneViolationStats.violation_count,
+            DroneViolationStats.first_at,
+            DroneViolationStats.last_at,
+        )
+        .where(DroneViolationStats.violation_count >= min_count)
+        .order_by(DroneViolationStats.violation_count.desc())
+        .limit(limit)
+    )
+    return [_stats_dict(row) for row in rows]
+
+
+async def hourly_counts(db: AsyncSession, hours: int) -> list:
+    """Counts for the last `hours` hours, oldest first; hours without violations are 0."""
+    end = _hour(datetime.now(timezone.utc))
+    start = end - timedelta(hours=hours - 1)
+    counts = dict((await db.execute(
+        select(HourlyViolationStats.hour, HourlyViolationStats.violation_count)
+        .where(HourlyViolationStats.hour >= start)
+    )).all())
+    return [
+        {"hour": hour, "violation_count": counts.get(hour, 0)}
+        for hour in (start + timedelta(hours=i) for i in range(hours))
+    ]
@@ -0,0 +1,109 @@
+import time
+import uuid
+
+import redis
+
+from app.celery_app import celery_app
+from app.config import settings
+from app.logger import logger
+from app.redis_client import redis_client
+
+
+INFLIGHT_KEY = "airguardian:scan:inflight"
+LAST_FINISHED_KEY = "airguardian:scan:last-finished"
+METRICS_KEY = "airguardian:scan:triggers"
+# Written by app.scheduler: interval, reason, next_scan_at, ...
+SCHEDULE_KEY = "airguardian:scan:schedule"
+
+# Delete the in-flight marker only if it still belongs to this scan
+_release_script = redis_client.register_script(
+    """
+    if redis.call("get", KEYS[1]) == ARGV[1] then
+        return redis.call("del", KEYS[1])
+    end
+    return 0
+    """
+)
+
+
+def _try_claim(source: str, min_interval: float = None):
+    """
+    Claim the single in-flight scan slot.
+    Returns a token, or None when the trigger is collapsed into another scan.
+    """
+    if min_interval is None:
+        min_interval = settings.SCAN_MIN_INTERVAL
+    redis_client.hincrby(METRICS_KEY, f"requested:{source}", 1)
+
+    last = redis_client.get(LAST_FINISHED_KEY)
+    if last is not None and time.time() - float(last) < min_interval:
+        redis_client.hincrby(METRICS_KEY, "collapsed_recent", 1)
+        return None
+
+    token = uuid.uuid4().hex
+    if not redis_client.set(INFLIGHT_KEY, token, nx=True, ex=settings.SCAN_LOCK_TTL):
+        redis_client.hincrby(METRICS_KEY, "collapsed_inflight", 1)
+        return None
+
+    redis_client.hincrby(METRICS_KEY, "dispatched", 1)
+    return token
+
+
+def request_scan(source: str = "api", min_interval: float = None) -> bool:
+    """
+    Ask for a scan from an HTTP handler (or the scheduler).
+    At most one scan is in flight, and none is started if one finished less
+    than `min_interval` (default SCAN_MIN_INTERVAL) seconds ago.
+    Returns True if a scan was dispatched.
+    """
+    try:
+        token = _try_claim(source, min_interval)
+    except redis.RedisError as e:
+        logger.warning(f"Scan coordinator: Redis unavailable ({e}), trigger dropped")
+        return False
+
+    if token is None:
+        return False
+
+    celery_app.send_task("scan_for_violations", kwargs={"token": token})
+    return True
+
+
+def begin_scan(token: str = None):
+    """
+    Called by the scan task. A token means the slot was claimed at dispatch;
+    without one (Celery beat) the task claims it itself.
+    Returns the token to pass to finish_scan, or None to skip this run.
+    """
+    if token is not None:
+        return token
+    return _try_claim("beat")
+
+
+def finish_scan(token: str):
+    """Release the in-flight slot and record when the scan finished."""
+    redis_client.set(LAST_FINISHED_KEY, time.time())
+    _release_script(keys=[INFLIGHT_KEY], args=[token])
+
+
+def scan_status() -> dict:
+    """Trigger counters plus the current in-flight / last-finished state."""
+    metrics = {
+        key.decode(): int(value)
+        for key, value in redis_client.hgetall(METRICS_KEY).items()
+    }
+    last = redis_client.get(LAST_FINISHED_KEY)
+    collapsed = metrics.get("collapsed_recent", 0) + metrics.get("collapsed_inflight", 0)
+
+    schedule = {
+        key.decode(): value.decode()
+        for key, value in redis_client.hgetall(SCHEDULE_KEY).items()
+    }
+
+    return {
+        "in_flight": bool(redis_client.exists(INFLIGHT_KEY)),
+        "schedule": schedule,
+        "last_finished_at": float(last) if last is not None else None,
+        "collapsed_total": collapsed,
+        "triggers": metrics,
+    }
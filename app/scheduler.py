@@ -0,0 +1,101 @@
+import time
+
+import redis
+
+from app.config import settings
+from app.logger import logger
+from app.redis_client import redis_client
+from app.scan_coordinator import INFLIGHT_KEY, SCHEDULE_KEY, request_scan
+from app.snapshot import upstream_fetches
+
+
+def choose_interval(drones: int, inside: int, approaching: list, previous: float, failed: bool = False) -> tuple:
+    """
+    Next scan interval, the reason for it and its cause (a short label for
+    metrics), from what the last scan saw:
+    - drones inside a zone: as often as allowed, but not more often than the
+      snapshot is refreshed (a faster scan would only see the same positions)
+    - drones approaching: before the earliest predicted entry
+    - empty sky: SCAN_INTERVAL_MAX
+    - traffic away from zones: back off from the previous interval, but not
+      past PREDICT_HORIZON, so a drone heading in is predicted before it arrives
+    """
+    low = max(settings.SCAN_INTERVAL_MIN, settings.SNAPSHOT_INTERVAL)
+    high = max(settings.SCAN_INTERVAL_MAX, low)
+
+    if failed:
+        return settings.SCAN_INTERVAL_DEFAULT, "last scan failed", "failed"
+    if inside:
+        return low, f"{inside} drones inside zones", "inside"
+    if approaching:
+        eta = min(alert["eta"] for alert in approaching)
+        return min(max(eta / 2, low), high), f"{len(approaching)} drones approaching, first in {eta:.0f}s", "approaching"
+    if not drones:
+        return high, "airspace empty", "empty"
+
+    interval = max(previous * settings.SCAN_BACKOFF, settings.SCAN_INTERVAL_DEFAULT)
+    return min(interval, high, max(settings.PREDICT_HORIZON, low)), "no drone near a zone", "quiet"
+
+
+def apply_budget(interval: float, reason: str, cause: str, now: float) -> tuple:
+    """
+    Keep upstream fetches within UPSTREAM_BUDGET_PER_MINUTE, counting every
+    fetch (API requests included), not only the scheduler's.
+    """
+    budget = settings.UPSTREAM_BUDGET_PER_MINUTE
+    if budget <= 0:
+        return interval, reason, cause
+
+    used = upstream_fetches(now)
+    if used >= budget:
+        wait = 60 - now % 60
+        return max(interval, wait), f"upstream budget used ({used}/{budget} this minute)", "budget"
+
+    floor = 60.0 / budget
+    if interval < floor:
+        return floor, f"{reason}; limited by upstream budget ({budget}/min)", "budget"
+    return interval, reason, cause
+
+
+def schedule_next(drones: int = 0, inside: int = 0, approaching: list = (), failed: bool = False) -> dict:
+    """Called at the end of every scan: pick the next interval and publish it."""
+    now = time.time()
+    previous = float(redis_client.hget(SCHEDULE_KEY, "interval") or settings.SCAN_INTERVAL_DEFAULT)
+
+    interval, reason, cause = choose_interval(drones, inside, approaching, previous, failed)
+    interval, reason, cause = apply_budget(interval, reason, cause, now)
+
+    schedule = {
+        "interval": round(interval, 2),
+        "reason": reason,
+        "cause": cause,
+        "next_scan_at": now + interval,
+        "computed_at": now,
+        "upstream_fetches_this_minute": upstream_fetches(now),
+    }
+    redis_client.hset(SCHEDULE_KEY, mapping=schedule)
+    return schedule
+
+
+def tick() -> bool:
+    """
+    Run by Celery beat every SCAN_TICK seconds: dispatch a scan once
+    next_scan_at has passed. Returns True if a scan was dispatched.
+    """
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hget(SCHEDULE_KEY, "next_scan_at")
+        pipe.exists(INFLIGHT_KEY)
+        next_at, in_flight = pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Scan scheduler: Redis unavailable ({e})")
+        return False
+
+    if next_at is not None and time.time() < float(next_at):
+        return False
+    # The due scan is still running: re-ticks are not new triggers, so they
+    # are not counted as requested / collapsed
+    if in_flight:
+        return False
+    # A scan that died before rescheduling is retried every SCAN_INTERVAL_MIN
+    return request_scan("scheduler", min_interval=settings.SCAN_INTERVAL_MIN)
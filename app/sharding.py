@@ -0,0 +1,204 @@
+import json
+import time
+import zlib
+
+import numpy as np
+import orjson
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.episodes import collect_sightings
+from app.geometry import DroneBatch, drones_to_arrays, zone_idx_from_pairs
+from app.owner_cache import owner_cache
+from app.redis_client import redis_client
+from app.snapshot import DroneSnapshot
+from app.utils import get_zone_registry, resolve_owners
+
+
+# Snapshot pinned for one fanned-out scan, so every task sees the same drones:
+# the merge step's copy (drone list + coordinate arrays) and one key per shard
+# holding only that shard's share
+FROZEN_KEY = "airguardian:scan:shard-snapshot:{token}"
+SHARD_KEY = "airguardian:scan:shard-snapshot:{token}:{shard}"
+# shard number (and "merge") -> timings of the last sharded scan, as JSON
+TIMINGS_KEY = "airguardian:scan:shard-timings"
+
+
+def shard_of(drone_id, shards: int) -> int:
+    """Stable across processes, unlike hash()."""
+    return zlib.crc32(str(drone_id).encode()) % shards
+
+
+def _shard_payloads(snapshot: DroneSnapshot, batch: DroneBatch, shards: int) -> list:
+    """
+    What each shard needs, split in one pass over the list: its drones'
+    indices into the full list, coordinates and owner ids, or, when the
+    snapshot was already classified while downloading, only its violators.
+    """
+    drones = snapshot.drones
+    assignment = np.fromiter((shard_of(drone.get("id"), shards) for drone in drones), np.int64, len(drones))
+    counts = np.bincount(assignment, minlength=shards).tolist()
+
+    if snapshot.inside is not None:
+        inside = [[] for _ in range(shards)]
+        owner_ids = [[] for _ in range(shards)]
+        for index, zone_id in snapshot.inside:
+            shard = assignment[index]
+            inside[shard].append([index, zone_id])
+            owner_id = drones[index].get("owner_id")
+            if owner_id is not None:
+                owner_ids[shard].append(str(owner_id))
+        return [
+            {
+                "drones": counts[shard],
+                "inside": orjson.dumps(inside[shard]),
+                "owner_ids": orjson.dumps(owner_ids[shard]),
+            }
+            for shard in range(shards)
+        ]
+
+    order = np.argsort(assignment, kind="stable")
+    bounds = np.cumsum([0] + counts)
+    payloads = []
+    for shard in range(shards):
+        rows = order[bounds[shard]:bounds[shard + 1]]
+        owner_ids = [drones[i].get("owner_id") for i in rows.tolist()]
+        payloads.append({
+            "drones": counts[shard],
+            "rows": rows.tobytes(),
+            "xyz": np.vstack([batch.x[rows], batch.y[rows], batch.z[rows]]).tobytes(),
+            "owner_ids": orjson.dumps([None if owner_id is None else str(owner_id) for owner_id in owner_ids]),
+        })
+    return payloads
+
+
+def freeze_snapshot(token: str, snapshot: DroneSnapshot, shards: int):
+    """
+    Pin the snapshot for a fanned-out scan. The drone list is decoded only
+    here and once in the merge step: shards get just their share, as
+    coordinate arrays, and the merge gets the full arrays ready.
+    """
+    batch = drones_to_arrays(snapshot.drones)
+    ttl = settings.SCAN_LOCK_TTL
+
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hset(FROZEN_KEY.format(token=token), mapping={
+        "snapshot": snapshot.to_json(),
+        "xyz": np.vstack([batch.x, batch.y, batch.z]).tobytes(),
+        "malformed": batch.malformed,
+        "shards": shards,
+    })
+    pipe.expire(FROZEN_KEY.format(token=token), ttl)
+    for shard, payload in enumerate(_shard_payloads(snapshot, batch, shards)):
+        key = SHARD_KEY.format(token=token, shard=shard)
+        pipe.hset(key, mapping=payload)
+        pipe.expire(key, ttl)
+    pipe.execute()
+
+
+def load_frozen(token: str) -> tuple:
+    """(snapshot, batch) of a fanned-out scan, for its merge step."""
+    stored = redis_client.hgetall(FROZEN_KEY.format(token=token))
+    if not stored:
+        raise LookupError(f"Snapshot for scan {token} expired")
+
+    snapshot = DroneSnapshot.from_json(stored[b"snapshot"])
+    x, y, z = np.frombuffer(stored[b"xyz"], dtype=np.float64).reshape(3, -1).copy()
+    batch = DroneBatch(drones=snapshot.drones, x=x, y=y, z=z, malformed=int(stored[b"malformed"]))
+    return snapshot, batch
+
+
+def _load_shard(token: str, shard: int) -> dict:
+    # Not deleted here: a redelivered shard task reads it again; release_frozen cleans up
+    stored = redis_client.hgetall(SHARD_KEY.format(token=token, shard=shard))
+    if not stored:
+        raise LookupError(f"Shard {shard} of scan {token} expired")
+    return {field.decode(): value for field, value in stored.items()}
+
+
+def release_frozen(token: str):
+    key = FROZEN_KEY.format(token=token)
+    shards = int(redis_client.hget(key, "shards") or 0)
+    redis_client.delete(key, *(SHARD_KEY.format(token=token, shard=shard) for shard in range(shards)))
+
+
+def scan_shard(token: str, shard: int, db: Session) -> dict:
+    """
+    Classify one shard of the pinned snapshot (unless the snapshot was
+    classified while downloading) and warm the owner cache for its violators,
+    so the merge step resolves owners without network calls.
+    Returns [index into the full list, zone id] for drones inside a zone,
+    plus the shard's timings.
+    """
+    started = time.perf_counter()
+    payload = _load_shard(token, shard)
+    loaded = time.perf_counter()
+
+    if "inside" in payload:
+        inside = orjson.loads(payload["inside"])
+        owner_ids = set(orjson.loads(payload["owner_ids"]))
+    else:
+        rows = np.frombuffer(payload["rows"], dtype=np.int64)
+        x, y, z = np.frombuffer(payload["xyz"], dtype=np.float64).reshape(3, -1)
+        shard_owners = orjson.loads(payload["owner_ids"])
+        registry = get_zone_registry(db)
+        zone_idx = registry.classify(x, y, z)
+        inside, owner_ids = [], set()
+        for i in np.flatnonzero(zone_idx >= 0).tolist():
+            inside.append([int(rows[i]), registry.zones[zone_idx[i]].zone_id])
+            if shard_owners[i] is not None:
+                owner_ids.add(shard_owners[i])
+    classified = time.perf_counter()
+
+    if owner_ids:
+        # Shards split by drone, so two may store the same new owner; the insert skips duplicates
+        _, to_cache = resolve_owners(owner_ids, db)
+        db.commit()
+        owner_cache.set_many(to_cache)
+    resolved = time.perf_counter()
+
+    return {
+        "shard": shard,
+        "drones": int(payload["drones"]),
+        "inside": inside,
+        "timings": {
+            "load": round(loaded - started, 4),
+            "classify": round(classified - loaded, 4),
+            "owners": round(resolved - classified, 4),
+            "total": round(resolved - started, 4),
+        },
+    }
+
+
+def merge_shards(results: list, batch: DroneBatch, db: Session) -> tuple:
+    """
+    Combine the shard results with the frozen batch:
+    (zone_idx, registry, sightings), as the single-task scan computes them.
+    Only the drones inside a zone are looked at.
+    """
+    registry = get_zone_registry(db)
+
+    # Zone ids, not indices: the registry may have been reloaded in between
+    pairs = [pair for result in results for pair in result["inside"]]
+    zone_idx = zone_idx_from_pairs(pairs, registry, len(batch))
+
+    sightings = collect_sightings(batch, zone_idx, registry)
+    return zone_idx, registry, sightings
+
+
+def record_timings(results: list, merge_seconds: float) -> dict:
+    timings = {str(result["shard"]): {"drones": result["drones"], **result["timings"]} for result in results}
+    timings["merge"] = {"total": round(merge_seconds, 4)}
+
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.delete(TIMINGS_KEY)
+    pipe.hset(TIMINGS_KEY, mapping={shard: json.dumps(values) for shard, values in timings.items()})
+    pipe.execute()
+    return timings
+
+
+def shard_timings() -> dict:
+    return {
+        shard.decode(): json.loads(values)
+        for shard, values in redis_client.hgetall(TIMINGS_KEY).items()
+    }
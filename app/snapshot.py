@@ -0,0 +1,178 @@
+import asyncio
+import time
+from dataclasses import dataclass, replace
+
+import httpx
+import orjson
+import redis
+
+from app.config import settings
+from app.fetcher import fetch_drones, run_async
+from app.geometry import ChunkClassifier
+from app.logger import logger
+from app.metrics import SNAPSHOT_STALE_SERVED
+from app.redis_client import redis_client, get_async_redis
+from app.utils import get_zone_registry
+
+
+SNAPSHOT_KEY = "airguardian:drones:snapshot"
+VERSION_KEY = "airguardian:drones:version"
+LOCK_KEY = "airguardian:drones:refresh-lock"
+# Upstream fetches per minute, read by the scan scheduler's rate budget
+FETCHES_KEY = "airguardian:upstream:fetches:{minute}"
+
+
+@dataclass
+class DroneSnapshot:
+    """Latest upstream drone list, shared by every endpoint and the scanner."""
+
+    version: int
+    fetched_at: float
+    drones: list
+    # [drone index, zone id] for drones inside a zone, classified while the
+    # list was downloading; None when the snapshot was not classified
+    inside: list = None
+    # Served in place of a fresh one because the upstream failed (not stored)
+    stale: bool = False
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    # orjson: the stdlib encoder holds the event loop for ~0.3s on 50k drones
+    def to_json(self) -> bytes:
+        return orjson.dumps({
+            "version": self.version,
+            "fetched_at": self.fetched_at,
+            "drones": self.drones,
+            "inside": self.inside,
+        })
+
+    @classmethod
+    def from_json(cls, raw) -> "DroneSnapshot":
+        data = orjson.loads(raw)
+        return cls(
+            version=data["version"],
+            fetched_at=data["fetched_at"],
+            drones=data["drones"],
+            inside=data.get("inside"),
+        )
+
+
+# Per-process copy, so most reads never leave the process
+_local = None
+
+
+def _is_fresh(snapshot: DroneSnapshot) -> bool:
+    return snapshot is not None and snapshot.age < settings.SNAPSHOT_INTERVAL
+
+
+async def _read_shared(client) -> DroneSnapshot:
+    """Return the snapshot stored in Redis if it is newer than the local copy."""
+    version = await client.get(VERSION_KEY)
+    if version is None:
+        return None
+    if _local is not None and int(version) <= _local.version:
+        return _local
+
+    raw = await client.get(SNAPSHOT_KEY)
+    return DroneSnapshot.from_json(raw) if raw else None
+
+
+def _fetches_key(ts: float) -> str:
+    return FETCHES_KEY.format(minute=int(ts // 60))
+
+
+def upstream_fetches(now: float = None) -> int:
+    """Upstream drone-list fetches made so far in the current minute."""
+    return int(redis_client.get(_fetches_key(now or time.time())) or 0)
+
+
+def _serve_stale(error: Exception, *candidates) -> DroneSnapshot:
+    """The newest of `candidates`, marked stale, unless none is recent enough to serve."""
+    available = [snapshot for snapshot in candidates if snapshot is not None]
+    newest = max(available, key=lambda snapshot: snapshot.fetched_at, default=None)
+    if newest is None or newest.age > settings.SNAPSHOT_MAX_STALE:
+        raise error
+
+    SNAPSHOT_STALE_SERVED.inc()
+    logger.warning(
+        f"Drone snapshot: upstream failed ({error!r}), serving one {newest.age:.0f}s old",
+        extra={"rate_key": "snapshot-stale"},
+    )
+    return replace(newest, stale=True)
+
+
+async def _refresh(client) -> DroneSnapshot:
+    """Fetch the upstream list once and publish it as the new shared snapshot."""
+    # Zone reloads query the DB, and this runs on the API's event loop
+    classifier = ChunkClassifier(await asyncio.to_thread(get_zone_registry))
+    drones = await fetch_drones(on_chunk=classifier)
+    key = _fetches_key(time.time())
+    await client.pipeline(transaction=False).incr(key).expire(key, 120).execute()
+    version = await client.incr(VERSION_KEY)
+    snapshot = DroneSnapshot(version=version, fetched_at=time.time(), drones=drones, inside=classifier.inside)
+    await client.set(SNAPSHOT_KEY, snapshot.to_json())
+    return snapshot
+
+
+async def get_snapshot() -> DroneSnapshot:
+    """
+    Return the current drone snapshot.
+    The first caller (in any process) that finds it older than SNAPSHOT_INTERVAL
+    takes a Redis lock and refreshes it; everyone else keeps serving the
+    previous one, so the upstream API sees one request per interval.
+    If the refresh fails, the last good snapshot is returned with stale=True
+    (up to SNAPSHOT_MAX_STALE seconds old) rather than an error.
+    """
+    global _local
+
+    if _is_fresh(_local):
+        return _local
+
+    client = get_async_redis()
+    try:
+        shared = await _read_shared(client)
+        if _is_fresh(shared):
+            _local = shared
+            return _local
+
+        lock_ttl_ms = int(settings.SNAPSHOT_LOCK_TIMEOUT * 1000)
+        if await client.set(LOCK_KEY, "1", nx=True, px=lock_ttl_ms):
+            try:
+                _local = await _refresh(client)
+                return _local
+            except httpx.HTTPError as e:
+                return _serve_stale(e, shared, _local)
+            finally:
+                await client.delete(LOCK_KEY)
+
+        # Someone else is refreshing: serve what we have, or wait for the first snapshot
+        if shared is not None:
+            _local = shared
+            return _local
+
+        deadline = time.monotonic() + settings.SNAPSHOT_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            shared = await _read_shared(client)
+            if shared is not None:
+                _local = shared
+                return _local
+
+    except redis.RedisError as e:
+        logger.warning(f"Drone snapshot: Redis unavailable ({e}), fetching directly")
+
+    # No usable shared snapshot: fetch for this process only
+    try:
+        drones = await fetch_drones()
+    except httpx.HTTPError as e:
+        return _serve_stale(e, _local)
+    version = _local.version if _local is not None else 0
+    _local = DroneSnapshot(version=version, fetched_at=time.time(), drones=drones)
+    return _local
+
+
+def get_snapshot_sync() -> DroneSnapshot:
+    """get_snapshot() for sync callers such as Celery tasks."""
+    return run_async(get_snapshot())
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import math
+import time
+
+import numpy as np
+import redis
+
+from app.config import settings
+from app.logger import logger
+from app.redis_client import redis_client, get_async_redis
+
+
+CHANNEL = "airguardian:stream:events"
+STATE_KEY = "airguardian:stream:state"
+
+# Put on a client queue when it fell behind and needs a full snapshot again
+RESYNC = object()
+
+
+# ---------------------------------------------------------
+# Scanner side: compute deltas and publish them
+# ---------------------------------------------------------
+
+def build_state(batch, in_nfz: np.ndarray) -> dict:
+    """drone_id -> [x, y, z, owner_id, in_nfz] for every well-formed drone."""
+    state = {}
+    x, y, z = batch.x.tolist(), batch.y.tolist(), batch.z.tolist()
+    for i, flag in enumerate(in_nfz.tolist()):
+        if math.isnan(x[i]):
+            continue
+        drone = batch.drones[i]
+        owner_id = drone.get("owner_id")
+        state[str(drone.get("id"))] = [
+            x[i], y[i], z[i],
+            None if owner_id is None else str(owner_id),
+            flag,
+        ]
+    return state
+
+
+def compute_delta(previous: dict, current: dict) -> dict:
+    """
+    Difference between two scan states:
+    moved (new or changed drones), removed drones,
+    new violations (entered a zone) and expired violations (left it or vanished).
+    """
+    moved = {
+        drone_id: entry
+        for drone_id, entry in current.items()
+        if previous.get(drone_id) != entry
+    }
+    removed = [drone_id for drone_id in previous if drone_id not in current]
+
+    was_violating = {drone_id for drone_id, entry in previous.items() if entry[4]}
+    violating = {drone_id for drone_id, entry in current.items() if entry[4]}
+
+    return {
+        "moved": moved,
+        "removed": removed,
+        "new_violations": sorted(violating - was_violating),
+        "expired_violations": sorted(was_violating - violating),
+    }
+
+
+def publish_scan(batch, in_nfz: np.ndarray, imminent: list = None) -> dict:
+    """
+    Publish what changed since the previous scan and store the new state.
+    `imminent` (predicted incursions) goes out with the delta as is.
+    """
+    current = build_state(batch, in_nfz)
+
+    raw = redis_client.get(STATE_KEY)
+    previous = json.loads(raw)["drones"] if raw else {}
+
+    delta = compute_delta(previous, current)
+    delta["imminent"] = imminent or []
+    delta["ts"] = time.time()
+
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.set(STATE_KEY, json.dumps({"ts": delta["ts"], "drones": current}))
+    if any(delta[key] for key in ("moved", "removed", "new_violations", "expired_violations", "imminent")):
+        pipe.publish(CHANNEL, json.dumps(delta))
+    pipe.execute()
+
+    return delta
+
+
+# ---------------------------------------------------------
+# API side: one Redis subscription per worker, fanned out to clients
+# ---------------------------------------------------------
+
+def sse_frame(event: str, data: bytes) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+
+
+async def snapshot_frame() -> bytes:
+    """Full current state, sent when a client connects or has to resync."""
+    raw = await get_async_redis().get(STATE_KEY)
+    return sse_frame("snapshot", raw or b'{"ts": null, "drones": {}}')
+
+
+class Broadcaster:
+    """
+    Listens to the scanner channel once per process and pushes each message,
+    encoded once, to every connected client's queue. A client whose queue is
+    full gets a resync instead of blocking the others.
+    """
+
+    def __init__(self, channel: str, queue_size: int):
+        self.channel = channel
+        self.queue_size = queue_size
+        self._clients = set()
+        self._task = None
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def subscribe(self) -> asyncio.Queue:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._clients.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._clients.discard(queue)
+
+    def _fan_out(self, frame):
+        for queue in self._clients:
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                # Drop the backlog, the client reloads the full state instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+    async def _run(self):
+        reconnect = False
+        while True:
+            pubsub = get_async_redis().pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                # Messages may have been missed while disconnected
+                if reconnect:
+                    self._fan_out(RESYNC)
+                reconnect = True
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._fan_out(sse_frame("delta", message["data"]))
+            except redis.RedisError as e:
+                logger.warning(f"Stream: Redis subscription lost ({e}), reconnecting")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+broadcaster = Broadcaster(CHANNEL, queue_size=settings.STREAM_QUEUE_SIZE)
+
+
+async def event_stream():
+    """SSE body for one client: a full snapshot, then deltas as they arrive."""
+    queue = broadcaster.subscribe()
+    try:
+        yield await snapshot_frame()
+        while True:
+            try:
+                frame = await asyncio.wait_for(queue.get(), timeout=settings.STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+
+            if frame is RESYNC:
+                frame = await snapshot_frame()
+            yield frame
+    finally:
+        broadcaster.unsubscribe(queue)
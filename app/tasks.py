@@ -11,68 +11,268 @@
 # from app.config import settings
 
 
-from datetime import datetime
+import time
 import httpx
+import redis
 from sqlalchemy.orm import Session
+from celery import chord
+from celery.signals import task_postrun, task_prerun, worker_process_init, worker_process_shutdown
+from billiard.process import current_process
+from prometheus_client import start_http_server
 
 from app.celery_app import celery_app
-from app.drone_db import SessionLocal, Base, engine
-from app.model import Violation, Owner
-from app.schemas import OwnerOut
-from app.utils import is_in_no_fly_zone, report_violation
+from app.drone_db import SessionLocal, engine
+from app.utils import get_zone_registry
+from app.geometry import drones_to_arrays, classify_zones, zone_idx_from_pairs
+from app.episodes import collect_sightings, track_episodes
+from app.owner_cache import owner_cache
+from app.snapshot import get_snapshot_sync
+from app.scan_coordinator import begin_scan, finish_scan
+from app.stream import publish_scan
+from app.prediction import predict_incursions
+from app.scheduler import schedule_next, tick
+from app.sharding import freeze_snapshot, load_frozen, merge_shards, record_timings, release_frozen, scan_shard
+from app.partitions import maintain_partitions
+from app.tracks import track_buffer, flush_if_due, prune_tracks
+from app.violation_window import maintain_window
+from app.metrics import SCAN_SECONDS, SCANS, TASK_SECONDS, TASKS, record_scan, scan_stage
+from app.profiler import profile_scan
 from app.config import settings
+from app.logger import logger
 
 
 # Use settings instead of os.getenv
 DRONES_LIST_API = settings.DRONES_LIST_API
 
 
+def _process_scan(snapshot, batch, zone_idx, registry, sightings, db: Session):
+    """Everything after classification, shared by the single-task and sharded scans."""
+    in_nfz = zone_idx >= 0
+
+    # Drones heading into a zone, from their velocity since the last snapshot
+    try:
+        imminent = predict_incursions(batch, zone_idx, registry, snapshot.fetched_at)
+    except redis.RedisError as e:
+        imminent = []
+        logger.warning(f"Incursion prediction failed: {e}")
+
+    if batch.malformed:
+        logger.warning(f"Skipped {batch.malformed} malformed drone entries", extra={"malformed": batch.malformed})
+
+    logger.info(
+        f"Scan: {len(batch)} drones, {len(sightings)} in restricted zone, {len(imminent)} approaching",
+        extra={"drones": len(batch), "inside": len(sightings), "approaching": len(imminent)},
+    )
+
+    # Only episode openings / closings touch the DB
+    counts = None
+    try:
+        with scan_stage("persist"):
+            counts = track_episodes(sightings, db)
+        logger.info(f"Episodes: {counts}", extra={"episodes": counts, "owner_cache": owner_cache.stats})
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error recording violations: {e}")
+
+    # Push what changed to /stream viewers
+    try:
+        publish_scan(batch, in_nfz, imminent)
+    except redis.RedisError as e:
+        logger.warning(f"Stream publish failed: {e}")
+
+    # Scan again sooner when drones are in or near zones, later when quiet
+    schedule = schedule_next(
+        drones=len(batch) - batch.malformed,
+        inside=int(in_nfz.sum()),
+        approaching=imminent,
+    )
+    logger.info(f"Next scan in {schedule['interval']}s: {schedule['reason']}", extra={"schedule": schedule})
+    record_scan(len(batch) - batch.malformed, int(in_nfz.sum()), len(imminent), counts)
+
+    # Position history: buffered here, written in bulk every so often
+    track_buffer.append(batch, snapshot.fetched_at)
+    try:
+        flush_if_due(db)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Track flush failed: {e}")
+
+
+def _fan_out(token: str, snapshot) -> bool:
+    """
+    Hand a large snapshot to SCAN_SHARDS shard tasks (a chord) whose
+    callback finishes the scan. Returns False to scan in this task instead.
+    """
+    shards = settings.SCAN_SHARDS
+    if shards <= 1 or len(snapshot.drones) < settings.SCAN_SHARD_MIN_DRONES:
+        return False
+
+    freeze_snapshot(token, snapshot, shards)
+    callback = finish_sharded_scan.s(token=token).on_error(abort_sharded_scan.si(token))
+    chord(scan_shard_task.s(token, shard) for shard in range(shards))(callback)
+    logger.info(f"Scan: {len(snapshot.drones)} drones fanned out to {shards} shards")
+    return True
+
+
 @celery_app.task(name='scan_for_violations')
-def scan_for_violations():
+def scan_for_violations(token: str = None):
+    # Collapse into the scan already running / just finished
+    token = begin_scan(token)
+    if token is None:
+        logger.info("Scan skipped: another scan is in flight or finished recently")
+        SCANS.labels("skipped").inc()
+        return
+
+    handed_off = False
+    outcome = "failed"
+    started = time.perf_counter()
     db: Session = SessionLocal()
     try:
-        response = httpx.get(DRONES_LIST_API, timeout=5)
-        response.raise_for_status()
-        data = response.json()
-
-        for drone in data:
-            try:
-                x = drone["x"]
-                y = drone["y"]
-                z = drone.get("z", 0)
-                drone_id = drone.get("id")
-                owner_id = drone.get("owner_id")
-
-                # skip missing owner_id
-                if owner_id is None:
-                    print(f"Skipping drone due to missing owner_id: {drone}")
-                    continue
-
-                owner_id = str(owner_id)
-
-                if is_in_no_fly_zone(x, y):
-                    print(
-                        f"Drone in restricted zone: x={x}, y={y}, z={z}, "
-                        f"drone_id={drone_id}, owner_id={owner_id}"
-                    )
-
-                    violation = Violation(
-                        drone_id=drone_id,
-                        owner_id=owner_id,
-                        x=x,
-                        y=y,
-                        z=z,
-                        timestamp=datetime.utcnow()
-                    )
-
-                    report_violation(violation, db)
-
-            except KeyError as e:
-                print(f"Malformed drone entry skipped: missing {e} in {drone}")
-            except Exception as e:
-                print(f"Error processing drone: {e}")
+        with profile_scan():
+            # Shared snapshot: no extra upstream request if the API already fetched it
+            snapshot = get_snapshot_sync()
+            if snapshot.stale:
+                # Old positions would only keep episodes open; try again after the backoff
+                logger.warning(f"Scan skipped: upstream unavailable, snapshot is {snapshot.age:.0f}s old")
+                outcome = "stale"
+                schedule_next(failed=True)
+                return
+
+            # Large fleets: shards classify in parallel, finish_sharded_scan persists
+            handed_off = _fan_out(token, snapshot)
+            if handed_off:
+                outcome = "sharded"
+                return
+
+            # Classify the whole drone list in one vectorized pass
+            with scan_stage("classify"):
+                batch = drones_to_arrays(snapshot.drones)
+                registry = get_zone_registry(db)
+                if snapshot.inside is None:
+                    zone_idx = classify_zones(batch, registry)
+                else:
+                    # Already classified chunk by chunk while the list was downloading
+                    zone_idx = zone_idx_from_pairs(snapshot.inside, registry, len(batch))
+                sightings = collect_sightings(batch, zone_idx, registry)
+
+            _process_scan(snapshot, batch, zone_idx, registry, sightings, db)
+            outcome = "ok"
 
     except httpx.HTTPError as e:
-        print(f"Drone fetch failed: {e}")
+        logger.error(f"Drone fetch failed: {e}")
+        schedule_next(failed=True)
+    finally:
+        db.close()
+        SCANS.labels(outcome).inc()
+        if not handed_off:
+            SCAN_SECONDS.observe(time.perf_counter() - started)
+            finish_scan(token)
+
+
+@celery_app.task(name='scan_shard')
+def scan_shard_task(token: str, shard: int):
+    """Classify one shard of a fanned-out scan and warm its owners."""
+    db: Session = SessionLocal()
+    try:
+        return scan_shard(token, shard, db)
     finally:
         db.close()
+
+
+@celery_app.task(name='finish_sharded_scan')
+def finish_sharded_scan(results: list, token: str):
+    """Chord callback: merge the shards and persist them as one scan."""
+    started = time.perf_counter()
+    db: Session = SessionLocal()
+    try:
+        with profile_scan("sharded-scan"):
+            snapshot, batch = load_frozen(token)
+            zone_idx, registry, sightings = merge_shards(results, batch, db)
+            _process_scan(snapshot, batch, zone_idx, registry, sightings, db)
+
+        timings = record_timings(results, time.perf_counter() - started)
+        slowest = max(results, key=lambda result: result["timings"]["total"])
+        logger.info(
+            f"Sharded scan: {len(results)} shards, slowest #{slowest['shard']} "
+            f"{slowest['timings']['total']}s, merge {timings['merge']['total']}s",
+            extra={"shard_timings": timings},
+        )
+    finally:
+        db.close()
+        release_frozen(token)
+        finish_scan(token)
+
+
+@celery_app.task(name='abort_sharded_scan')
+def abort_sharded_scan(token: str):
+    """A shard failed: free the scan slot so the next scan is not blocked."""
+    logger.error(f"Sharded scan {token} failed, releasing it")
+    release_frozen(token)
+    finish_scan(token)
+    schedule_next(failed=True)
+
+
+@celery_app.task(name='scan_scheduler_tick')
+def scan_scheduler_tick():
+    """Start a scan when the adaptive schedule says one is due."""
+    return tick()
+
+
+@celery_app.task(name='maintain_violation_partitions')
+def maintain_violation_partitions():
+    """Create upcoming daily partitions and drop the expired ones."""
+    return maintain_partitions(engine)
+
+
+@celery_app.task(name='trim_violation_window')
+def trim_violation_window():
+    """Drop expired entries from the /nfz hot window, or load it if it is cold."""
+    db: Session = SessionLocal()
+    try:
+        return maintain_window(db)
+    finally:
+        db.close()
+
+
+@celery_app.task(name='prune_drone_tracks')
+def prune_drone_tracks():
+    """Delete position history older than TRACK_RETENTION_DAYS."""
+    db: Session = SessionLocal()
+    try:
+        return prune_tracks(db, settings.TRACK_RETENTION_DAYS)
+    finally:
+        db.close()
+
+
+@worker_process_shutdown.connect
+def flush_tracks_on_shutdown(**kwargs):
+    """Don't lose the buffered positions when a worker process exits."""
+    db: Session = SessionLocal()
+    try:
+        track_buffer.flush(db)
+    except Exception as e:
+        logger.error(f"Track flush on shutdown failed: {e}")
+    finally:
+        db.close()
+
+
+@worker_process_init.connect
+def start_metrics_exporter(**kwargs):
+    """Serve this worker process's metrics; prefork children each get their own port."""
+    if settings.WORKER_METRICS_PORT:
+        port = settings.WORKER_METRICS_PORT + (current_process().index or 0)
+        start_http_server(port)
+        logger.info(f"Worker metrics on :{port}/metrics")
+
+
+@task_prerun.connect
+def start_task_timer(task=None, **kwargs):
+    task.request.metrics_started = time.perf_counter()
+
+
+@task_postrun.connect
+def observe_task(task=None, state=None, **kwargs):
+    started = getattr(task.request, "metrics_started", None)
+    if started is not None:
+        TASK_SECONDS.labels(task.name).observe(time.perf_counter() - started)
+    TASKS.labels(task.name, state or "UNKNOWN").inc()
@@ -0,0 +1,195 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.logger import logger
+from app.model import DroneTrack
+
+
+# On-disk layout of a chunk's columns
+TIME_DTYPE = np.dtype("<f8")
+COORD_DTYPE = np.dtype("<f4")
+
+
+class TrackBuffer:
+    """
+    Per-drone ring buffers of recent positions, stored column-wise:
+    one row per drone (slot) in 2-D float32 x/y/z and float64 time arrays.
+    A scan is appended with a few vectorized writes; when a drone has more
+    than `capacity` unflushed samples its oldest ones are overwritten.
+    """
+
+    def __init__(self, capacity: int, initial_slots: int = 1024):
+        self.capacity = capacity
+        self._slots = {}
+        self._allocate(initial_slots)
+        self.last_flush = time.monotonic()
+        # Snapshot time of the last append; rescanning a snapshot adds nothing
+        self.last_timestamp = None
+
+    def _allocate(self, rows: int):
+        self.t = np.zeros((rows, self.capacity), dtype=np.float64)
+        self.x = np.zeros((rows, self.capacity), dtype=np.float32)
+        self.y = np.zeros((rows, self.capacity), dtype=np.float32)
+        self.z = np.zeros((rows, self.capacity), dtype=np.float32)
+        # Samples written per slot since the last flush (may exceed capacity)
+        self.written = np.zeros(rows, dtype=np.int64)
+
+    def _grow(self, rows: int):
+        old = (self.t, self.x, self.y, self.z, self.written)
+        self._allocate(rows)
+        used = len(old[4])
+        self.t[:used], self.x[:used], self.y[:used], self.z[:used] = old[:4]
+        self.written[:used] = old[4]
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _slots_for(self, drone_ids: list) -> np.ndarray:
+        slots = self._slots
+        indices = np.fromiter(
+            (slots.setdefault(drone_id, len(slots)) for drone_id in drone_ids),
+            dtype=np.int64,
+            count=len(drone_ids),
+        )
+        if len(slots) > len(self.written):
+            self._grow(max(len(slots), 2 * len(self.written)))
+        return indices
+
+    def append(self, batch, timestamp: float):
+        """Add one scan's well-formed positions, all stamped `timestamp` (epoch seconds)."""
+        if timestamp == self.last_timestamp:
+            return
+        self.last_timestamp = timestamp
+
+        valid = np.flatnonzero(~np.isnan(batch.x))
+        if not len(valid):
+            return
+
+        drones = batch.drones
+        slots = self._slots_for([str(drones[i].get("id")) for i in valid.tolist()])
+
+        # A drone listed twice in one scan keeps its last position
+        slots, last = np.unique(slots[::-1], return_index=True)
+        valid = valid[::-1][last]
+
+        column = self.written[slots] % self.capacity
+        self.t[slots, column] = timestamp
+        self.x[slots, column] = batch.x[valid]
+        self.y[slots, column] = batch.y[valid]
+        self.z[slots, column] = batch.z[valid]
+        self.written[slots] += 1
+
+    def due(self) -> bool:
+        if not self._slots:
+            return False
+        if time.monotonic() - self.last_flush >= settings.TRACK_FLUSH_INTERVAL:
+            return True
+        # Flush before any drone starts losing samples to the ring
+        return bool(self.written.max() >= self.capacity)
+
+    def drain(self) -> list:
+        """Return one chunk dict per drone (samples oldest first) and reset the buffer."""
+        used = len(self._slots)
+        written = self.written[:used]
+        counts = np.minimum(written, self.capacity)
+
+        # Unroll every ring at once: row i starts at its oldest sample
+        start = (written - counts)[:, None]
+        order = (start + np.arange(self.capacity)[None, :]) % self.capacity
+        rows = np.arange(used)[:, None]
+        t = self.t[:used][rows, order].astype(TIME_DTYPE)
+        x = self.x[:used][rows, order].astype(COORD_DTYPE)
+        y = self.y[:used][rows, order].astype(COORD_DTYPE)
+        z = self.z[:used][rows, order].astype(COORD_DTYPE)
+
+        first = t[:, 0].tolist()
+        last = t[rows[:, 0], np.maximum(counts - 1, 0)].tolist()
+        chunks = [
+            {
+                "drone_id": drone_id,
+                "start_at": _to_datetime(first[slot]),
+                "end_at": _to_datetime(last[slot]),
+                "sample_count": int(counts[slot]),
+                "t": t[slot, :counts[slot]].tobytes(),
+                "x": x[slot, :counts[slot]].tobytes(),
+                "y": y[slot, :counts[slot]].tobytes(),
+                "z": z[slot, :counts[slot]].tobytes(),
+            }
+            for drone_id, slot in self._slots.items()
+            if counts[slot]
+        ]
+
+        # Drones that left stop taking slots
+        self._slots = {}
+        self.written[:] = 0
+        self.last_flush = time.monotonic()
+        return chunks
+
+    def flush(self, db: Session) -> int:
+        """Write every drone's buffered track as one chunk row, in one bulk insert."""
+        chunks = self.drain()
+        if chunks:
+            db.execute(insert(DroneTrack), chunks)
+            db.commit()
+        return len(chunks)
+
+
+def _to_datetime(ts: float) -> datetime:
+    return datetime.fromtimestamp(float(ts), tz=timezone.utc)
+
+
+# One buffer per worker process, fed by scan_for_violations
+track_buffer = TrackBuffer(capacity=settings.TRACK_CAPACITY)
+
+
+def flush_if_due(db: Session) -> int:
+    if not track_buffer.due():
+        return 0
+    count = track_buffer.flush(db)
+    logger.info(f"Tracks: flushed {count} drone chunks")
+    return count
+
+
+def prune_tracks(db: Session, retention_days: int) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    deleted = db.execute(delete(DroneTrack).where(DroneTrack.end_at < cutoff)).rowcount
+    db.commit()
+    return deleted
+
+
+async def drone_track(db: AsyncSession, drone_id: str, start: datetime, end: datetime) -> dict:
+    """
+    Positions of one drone in [start, end), oldest first, as columns:
+    {"t": epoch seconds, "x": ..., "y": ..., "z": ...} numpy arrays.
+    Samples still buffered in a worker show up after its next flush.
+    """
+    chunks = (await db.execute(
+        select(DroneTrack.t, DroneTrack.x, DroneTrack.y, DroneTrack.z)
+        .where(
+            DroneTrack.drone_id == drone_id,
+            DroneTrack.end_at >= start,
+            DroneTrack.start_at < end,
+        )
+    )).all()
+
+    if not chunks:
+        empty = np.empty(0, dtype=COORD_DTYPE)
+        return {"t": np.empty(0, dtype=TIME_DTYPE), "x": empty, "y": empty, "z": empty}
+
+    # Positional: Row.t is the row's own tuple accessor
+    t = np.concatenate([np.frombuffer(chunk[0], dtype=TIME_DTYPE) for chunk in chunks])
+    columns = {
+        axis: np.concatenate([np.frombuffer(chunk[i], dtype=COORD_DTYPE) for chunk in chunks])
+        for i, axis in enumerate(("x", "y", "z"), start=1)
+    }
+
+    # Chunks from different workers can interleave in time
+    keep = (t >= start.timestamp()) & (t < end.timestamp())
+    order = np.argsort(t[keep], kind="stable")
+    return {"t": t[keep][order], **{axis: values[keep][order] for axis, values in columns.items()}}
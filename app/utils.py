@@ -56,18 +56,86 @@
 
 # 	return {"message": "Violation recorded"}
 
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
-from fastapi import Depends, HTTPException
+from sqlalchemy.exc import SQLAlchemyError
+from fastapi import HTTPException
 from datetime import datetime, timezone
+import json
+import time
 
-from app.drone_db import SessionLocal
-from app.model import Owner, Violation
-from app.fetcher import fetch_owner
+from app.config import settings
+from app.drone_db import SessionLocal, AsyncSessionLocal
+from app.model import Owner, Violation, NoFlyZone
+from app.fetcher import fetch_owners, run_async
+from app.geometry import classify_points
+from app.logger import logger
+from app.metrics import scan_stage
+from app.owner_cache import owner_cache
+from app.rollups import update_rollups
+from app.violation_window import add_violations
+from app.zones import ZoneRegistry, default_zones, load_zone_file, zone_from_dict
 
 
-def is_in_no_fly_zone(x: float, y: float) -> bool:
-    """Return True if the drone is inside the no-fly zone radius."""
-    return x ** 2 + y ** 2 <= 1000 ** 2
+# Cached zone registry, rebuilt every NFZ_ZONES_REFRESH_SECONDS
+_zone_registry = None
+_zone_registry_loaded_at = 0.0
+
+
+def load_zones(db: Session) -> list:
+    """Load active zones from the DB, falling back to NFZ_ZONES_FILE, then the default circle."""
+    try:
+        rows = db.query(NoFlyZone).filter(NoFlyZone.active.is_(True)).all()
+    except SQLAlchemyError as e:
+        logger.warning(f"Could not load no-fly zones from DB: {e}")
+        db.rollback()
+        rows = []
+
+    if rows:
+        return [
+            zone_from_dict({
+                "id": row.id,
+                "type": row.kind,
+                "min_alt": row.min_alt,
+                "max_alt": row.max_alt,
+                **json.loads(row.geometry),
+            })
+            for row in rows
+        ]
+
+    if settings.NFZ_ZONES_FILE:
+        return load_zone_file(settings.NFZ_ZONES_FILE)
+
+    return default_zones()
+
+
+def get_zone_registry(db: Session = None) -> ZoneRegistry:
+    """Return the cached zone registry, reloading it when it is older than the refresh interval."""
+    global _zone_registry, _zone_registry_loaded_at
+
+    age = time.monotonic() - _zone_registry_loaded_at
+    if _zone_registry is not None and age < settings.NFZ_ZONES_REFRESH_SECONDS:
+        return _zone_registry
+
+    own_session = db is None
+    if own_session:
+        db = SessionLocal()
+    try:
+        zones = load_zones(db)
+    finally:
+        if own_session:
+            db.close()
+
+    _zone_registry = ZoneRegistry(zones, cell_size=settings.NFZ_GRID_CELL_SIZE or None)
+    _zone_registry_loaded_at = time.monotonic()
+    logger.info(f"Loaded {len(zones)} no-fly zones")
+    return _zone_registry
+
+
+def is_in_no_fly_zone(x: float, y: float, z: float = None) -> bool:
+    """Return True if the drone is inside any no-fly zone."""
+    return bool(classify_points(x, y, z, registry=get_zone_registry())[0])
 
 
 def get_db():
@@ -79,63 +147,166 @@ def get_db():
         db.close()
 
 
-def report_violation(data, db: Session):
+async def get_async_db():
+    """FastAPI dependency for an async DB session."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def _owner_from_api(owner_id: str, owner_data: dict) -> Owner:
+    """Build an Owner row from the external API payload."""
+    # Parse purchased_at safely
+    purchased_at = owner_data.get("purchased_at")
+    if isinstance(purchased_at, str):
+        try:
+            purchased_at = datetime.fromisoformat(purchased_at)
+        except ValueError:
+            purchased_at = None
+
+    return Owner(
+        id=owner_id,
+        first_name=owner_data["first_name"],
+        last_name=owner_data["last_name"],
+        email=owner_data["email"],
+        phone_number=owner_data["phone_number"],
+        social_security_number=owner_data["social_security_number"],
+        purchased_at=purchased_at,
+    )
+
+
+def owner_to_dict(owner: Owner) -> dict:
+    """Cacheable owner fields (what OwnerOut needs, plus email)."""
+    return {
+        "first_name": owner.first_name,
+        "last_name": owner.last_name,
+        "email": owner.email,
+        "phone_number": owner.phone_number,
+        "social_security_number": owner.social_security_number,
+    }
+
+
+@scan_stage("owners")
+def resolve_owners(owner_ids: set, db: Session) -> tuple:
     """
-    Record a violation in the database.
-    - Fetch owner if not found locally
-    - Create violation entry
+    Resolve owners through the cache, then the DB, then the external API.
+    New owners are inserted in the caller's transaction (not committed).
+    Returns (owners, to_cache): owners maps owner_id -> owner dict for every
+    owner that exists; to_cache holds the lookups to store once committed.
     """
-
     # -----------------------------------------
-    # 1. Check if owner exists locally
+    # 1. Owner cache (in-process LRU, then Redis)
     # -----------------------------------------
-    owner = db.query(Owner).filter(Owner.id == str(data.owner_id)).first()
+    cached, missing = owner_cache.get_many(owner_ids)
+    owners = {owner_id: data for owner_id, data in cached.items() if data is not None}
+    to_cache = {}
 
     # -----------------------------------------
-    # 2. If not found -> fetch from external API
+    # 2. Owners already stored, in one query
     # -----------------------------------------
-    if not owner:
-        owner_data = fetch_owner(data.owner_id)
-        if not owner_data:
-            raise HTTPException(status_code=404, detail="Owner not found")
-
-        # Parse purchased_at safely
-        purchased_at = owner_data.get("purchased_at")
-        if isinstance(purchased_at, str):
-            try:
-                purchased_at = datetime.fromisoformat(purchased_at)
-            except ValueError:
-                purchased_at = None
-
-        owner = Owner(
-            id=data.owner_id,
-            first_name=owner_data["first_name"],
-            last_name=owner_data["last_name"],
-            email=owner_data["email"],
-            phone_number=owner_data["phone_number"],
-            social_security_number=owner_data["social_security_number"],
-            purchased_at=purchased_at,
-        )
-
-        db.add(owner)
+    if missing:
+        for owner in db.scalars(select(Owner).where(Owner.id.in_(missing))):
+            owners[owner.id] = to_cache[owner.id] = owner_to_dict(owner)
+        missing -= owners.keys()
 
     # -----------------------------------------
-    # 3. Create violation
+    # 3. Fetch the rest from external API, concurrently
     # -----------------------------------------
-    violation = Violation(
-        drone_id=data.drone_id,
-        owner_id=data.owner_id,
-        x=data.x,
-        y=data.y,
-        z=data.z,
-        timestamp=datetime.now(timezone.utc),
-    )
+    if missing:
+        new_owners = []
+        for owner_id, owner_data in run_async(fetch_owners(missing)).items():
+            if not owner_data:
+                logger.warning(
+                    f"Owner {owner_id} not found, skipping its violations",
+                    extra={"owner_id": owner_id, "rate_key": f"owner-missing:{owner_id}"},
+                )
+                to_cache[owner_id] = None
+                continue
+            # One malformed payload must not roll back the whole scan
+            try:
+                owner = _owner_from_api(owner_id, owner_data)
+            except (KeyError, TypeError, AttributeError) as e:
+                logger.warning(
+                    f"Owner {owner_id} payload is malformed ({e!r}), skipping its violations",
+                    extra={"owner_id": owner_id, "rate_key": f"owner-malformed:{owner_id}"},
+                )
+                to_cache[owner_id] = None
+                continue
+            new_owners.append(owner)
+            owners[owner_id] = to_cache[owner_id] = owner_to_dict(owner)
+
+        if new_owners:
+            # Another scan or shard may be storing the same owner: first insert wins.
+            # Sorted, so concurrent inserts lock rows in the same order
+            columns = [column.name for column in Owner.__table__.columns]
+            db.execute(
+                insert(Owner)
+                .values([
+                    {column: getattr(owner, column) for column in columns}
+                    for owner in sorted(new_owners, key=lambda owner: owner.id)
+                ])
+                .on_conflict_do_nothing(index_elements=["id"])
+            )
+
+    return owners, to_cache
 
-    db.add(violation)
+
+def report_violations(records: list, db: Session, before_commit=None) -> list:
+    """
+    Record all violations of one scan in a single transaction.
+    - Resolve owners via cache, one IN query, then external API concurrently
+    - Bulk insert the violations, update the rollups and commit once
+    Violations whose owner cannot be resolved are skipped.
+    `before_commit(rows)` runs inside the same transaction, after the insert.
+    Once committed, the rows are added to the /nfz hot window in Redis.
+    Returns the rows written, with their ids.
+    """
+    if not records:
+        return []
+
+    owners, to_cache = resolve_owners({record["owner_id"] for record in records}, db)
 
     # -----------------------------------------
-    # 4. Commit changes ONCE for performance
+    # One bulk insert + one commit
     # -----------------------------------------
+    now = datetime.now(timezone.utc)
+    rows = [
+        {**record, "timestamp": now}
+        for record in records
+        if record["owner_id"] in owners
+    ]
+
+    if rows:
+        ids = db.execute(
+            insert(Violation).returning(Violation.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+        for row, violation_id in zip(rows, ids):
+            row["id"] = violation_id
+        update_rollups(rows, db)
+    if before_commit is not None:
+        before_commit(rows)
     db.commit()
 
+    # Cache only what is now committed
+    owner_cache.set_many(to_cache)
+    add_violations(rows, owners)
+
+    return rows
+
+
+def report_violation(data, db: Session):
+    """
+    Record one violation (a ViolationInput) for single-record callers.
+    Goes through report_violations, so the row also reaches the rollups and
+    the /nfz hot window. 404 if the owner cannot be resolved.
+    """
+    rows = report_violations([{
+        "drone_id": data.drone_id,
+        "owner_id": str(data.owner_id),
+        "x": data.x,
+        "y": data.y,
+        "z": data.z,
+    }], db)
+    if not rows:
+        raise HTTPException(status_code=404, detail="Owner not found")
+
     return {"message": "Violation recorded"}
@@ -0,0 +1,119 @@
+import base64
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+import orjson
+from fastapi import HTTPException
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.model import Owner, Violation
+
+
+# Violations older than this are not served by /nfz
+WINDOW = timedelta(hours=24)
+
+# Only what ViolationOut / OwnerOut serialize, plus the id for the cursor
+PAGE_COLUMNS = (
+    Violation.id,
+    Violation.drone_id,
+    Violation.timestamp,
+    Violation.x,
+    Violation.y,
+    Violation.z,
+    Owner.first_name,
+    Owner.last_name,
+    Owner.social_security_number,
+    Owner.phone_number,
+)
+
+
+def encode_cursor(timestamp: datetime, violation_id: int) -> str:
+    """Opaque keyset cursor for the (timestamp, id) ordering."""
+    raw = f"{timestamp.isoformat()}|{violation_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        timestamp, violation_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(violation_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def window_start() -> datetime:
+    return datetime.now(timezone.utc) - WINDOW
+
+
+def _window_filter(since: tuple):
+    """Rows in the 24h window, strictly after the cursor if there is one."""
+    conditions = [Violation.timestamp >= window_start()]
+    if since is not None:
+        conditions.append(tuple_(Violation.timestamp, Violation.id) > since)
+    return conditions
+
+
+async def window_etag(db: AsyncSession, since: tuple, limit: int) -> str:
+    """
+    Cheap validator for a page: row count and newest id after the cursor.
+    It changes when rows are added or fall out of the window.
+    """
+    count, max_id = (await db.execute(
+        select(func.count(Violation.id), func.max(Violation.id)).where(*_window_filter(since))
+    )).one()
+    raw = f"{since}|{limit}|{count}|{max_id}"
+    return '"' + hashlib.sha1(raw.encode()).hexdigest() + '"'
+
+
+async def violations_page(db: AsyncSession, since: tuple, limit: int) -> tuple:
+    """
+    Return (rows, next_cursor, has_more) for one page, oldest first.
+    Rows are plain column tuples (see PAGE_COLUMNS), not ORM objects.
+    Pass next_cursor back as `since` to get the next page, or later to get only new rows.
+    """
+    rows = (await db.execute(
+        select(*PAGE_COLUMNS)
+        .join(Owner, Violation.owner_id == Owner.id)
+        .where(*_window_filter(since))
+        .order_by(Violation.timestamp, Violation.id)
+        .limit(limit + 1)
+    )).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if rows:
+        next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id)
+    elif since is not None:
+        next_cursor = encode_cursor(*since)
+    else:
+        next_cursor = None
+
+    return rows, next_cursor, has_more
+
+
+def violation_dict(row) -> dict:
+    """One PAGE_COLUMNS tuple in the ViolationOut shape."""
+    _, drone_id, timestamp, x, y, z, first_name, last_name, ssn, phone_number = row
+    return {
+        "drone_id": drone_id,
+        "timestamp": timestamp,
+        "x": x,
+        "y": y,
+        "z": z,
+        "owner": {
+            "first_name": first_name,
+            "last_name": last_name,
+            "social_security_number": ssn,
+            "phone_number": phone_number,
+        },
+    }
+
+
+def encode_violations(rows) -> bytes:
+    """
+    JSON body in the ViolationOut shape, built straight from the column tuples.
+    The columns are already typed by the database, so there is no per-row validation.
+    """
+    return orjson.dumps([violation_dict(row) for row in rows], option=orjson.OPT_UTC_Z)
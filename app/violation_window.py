@@ -0,0 +1,222 @@
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import orjson
+import redis
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.logger import logger
+from app.model import Owner, Violation
+from app.redis_client import redis_client
+from app.violation_queries import PAGE_COLUMNS, encode_cursor, violation_dict, window_start
+
+
+# Violations of the last 24h, scored by timestamp in microseconds (exact in a
+# double). Members are "<zero-padded id>|<ViolationOut JSON>", so members with
+# the same timestamp sort by id and a page body is the payloads joined.
+WINDOW_KEY = "airguardian:violations:window"
+# Set once the window holds everything from Postgres. Its value is the lowest
+# score still complete (0 = the whole 24h); absent = cold, /nfz reads Postgres.
+WARM_KEY = "airguardian:violations:window:floor"
+
+ID_WIDTH = 19
+LOAD_BATCH = 5000
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _score(timestamp: datetime) -> int:
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return (timestamp - _EPOCH) // _MICROSECOND
+
+
+def _timestamp(score: float) -> datetime:
+    return _EPOCH + timedelta(microseconds=int(score))
+
+
+def _member(row) -> bytes:
+    """One PAGE_COLUMNS tuple as a window member."""
+    payload = orjson.dumps(violation_dict(row), option=orjson.OPT_UTC_Z)
+    return f"{row[0]:0{ID_WIDTH}d}|".encode() + payload
+
+
+def _split(member: bytes) -> tuple:
+    return int(member[:ID_WIDTH]), member[ID_WIDTH + 1:]
+
+
+# ---------------------------------------------------------
+# Writes: scanner, trim / load task (sync)
+# ---------------------------------------------------------
+
+def add_violations(rows: list, owners: dict):
+    """
+    Add freshly committed violation rows (with their ids) to the window.
+    On failure the window is marked cold, so /nfz goes back to Postgres
+    until the next load instead of missing these rows.
+    """
+    if not rows:
+        return
+
+    mapping = {}
+    for row in rows:
+        owner = owners[row["owner_id"]]
+        member = _member((
+            row["id"], str(row["drone_id"]), row["timestamp"], row["x"], row["y"], row["z"],
+            owner["first_name"], owner["last_name"], owner["social_security_number"], owner["phone_number"],
+        ))
+        mapping[member] = _score(row["timestamp"])
+
+    try:
+        redis_client.zadd(WINDOW_KEY, mapping)
+    except redis.RedisError as e:
+        logger.warning(f"Violation window update failed, marking it cold: {e}")
+        try:
+            redis_client.delete(WARM_KEY)
+        except redis.RedisError:
+            pass
+
+
+def _trim() -> Optional[int]:
+    """
+    Drop entries older than the window and the oldest beyond
+    VIOLATION_WINDOW_MAX_ENTRIES. Returns the new floor if the cap cut into the window.
+    """
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.zremrangebyscore(WINDOW_KEY, "-inf", f"({_score(window_start())}")
+    pipe.zremrangebyrank(WINDOW_KEY, 0, -(settings.VIOLATION_WINDOW_MAX_ENTRIES + 1))
+    pipe.zrange(WINDOW_KEY, 0, 0, withscores=True)
+    _, capped, oldest = pipe.execute()
+
+    if capped and oldest:
+        # Rows with the oldest kept timestamp may have gone too
+        return int(oldest[0][1]) + 1
+    return None
+
+
+def load_window(db: Session) -> int:
+    """Fill the window from Postgres (cold start) and mark it warm. Returns rows loaded."""
+    rows = db.execute(
+        select(*PAGE_COLUMNS)
+        .join(Owner, Violation.owner_id == Owner.id)
+        .where(Violation.timestamp >= window_start())
+        .order_by(Violation.timestamp, Violation.id)
+        .execution_options(yield_per=LOAD_BATCH)
+    )
+
+    loaded = 0
+    for batch in rows.partitions():
+        redis_client.zadd(WINDOW_KEY, {_member(row): _score(row.timestamp) for row in batch})
+        loaded += len(batch)
+
+    floor = _trim()
+    redis_client.set(WARM_KEY, floor or 0)
+    return loaded
+
+
+def maintain_window(db: Session) -> dict:
+    """Beat task body: load the window if it is cold, otherwise trim it."""
+    if redis_client.get(WARM_KEY) is None:
+        loaded = load_window(db)
+        logger.info(f"Violation window loaded from Postgres ({loaded} rows)")
+        return {"loaded": loaded}
+
+    floor = _trim()
+    if floor is not None:
+        current = int(redis_client.get(WARM_KEY) or 0)
+        redis_client.set(WARM_KEY, max(current, floor))
+        logger.warning(
+            "Violation window is over VIOLATION_WINDOW_MAX_ENTRIES, older pages are read from Postgres",
+            extra={"rate_key": "violation-window-capped"},
+        )
+    return {"trimmed": True, "floor": floor}
+
+
+# ---------------------------------------------------------
+# Reads: /nfz (async)
+# ---------------------------------------------------------
+
+@dataclass
+class WindowPage:
+    """Bounds and validator of one /nfz page served from the window."""
+    etag: str
+    since: Optional[tuple]
+    lower: int
+    same_score: int
+    limit: int
+
+    async def read(self, client) -> Optional[tuple]:
+        """
+        (body, next_cursor, has_more) in the shape of violations_page +
+        encode_violations, or None if Redis failed.
+        """
+        try:
+            entries = await client.zrangebyscore(
+                WINDOW_KEY, self.lower, "+inf",
+                start=0, num=self.limit + 1 + self.same_score, withscores=True,
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Violation window read failed: {e}", extra={"rate_key": "violation-window-read"})
+            return None
+
+        page = []
+        for member, score in entries:
+            violation_id, payload = _split(member)
+            # Same timestamp as the cursor: only ids after it
+            if self.same_score and score == self.lower and violation_id <= self.since[1]:
+                continue
+            page.append((score, violation_id, payload))
+
+        has_more = len(page) > self.limit
+        page = page[:self.limit]
+
+        if page:
+            score, violation_id, _ = page[-1]
+            next_cursor = encode_cursor(_timestamp(score), violation_id)
+        elif self.since is not None:
+            next_cursor = encode_cursor(*self.since)
+        else:
+            next_cursor = None
+
+        return b"[" + b",".join(payload for _, _, payload in page) + b"]", next_cursor, has_more
+
+
+async def open_window_page(client, since: Optional[tuple], limit: int) -> Optional[WindowPage]:
+    """
+    The page after `since` if the window can serve it: None while the window
+    is cold, if the page reaches below the floor, or if Redis fails.
+    """
+    lower = _score(window_start())
+    since_score = _score(since[0]) if since is not None else None
+    after_cursor = since_score is not None and since_score >= lower
+    if after_cursor:
+        lower = since_score
+
+    try:
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.get(WARM_KEY)
+            pipe.zcount(WINDOW_KEY, lower, "+inf")
+            pipe.zrevrange(WINDOW_KEY, 0, 0)
+            pipe.zcount(WINDOW_KEY, lower, lower)
+            floor, count, newest, same_score = await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Violation window read failed: {e}", extra={"rate_key": "violation-window-read"})
+        return None
+
+    if floor is None or int(floor) > lower:
+        return None
+
+    newest_id = _split(newest[0])[0] if newest else None
+    raw = f"window|{since}|{limit}|{count}|{newest_id}"
+    return WindowPage(
+        etag='"' + hashlib.sha1(raw.encode()).hexdigest() + '"',
+        since=since,
+        lower=lower,
+        same_score=same_score if after_cursor else 0,
+        limit=limit,
+    )
@@ -0,0 +1,311 @@
+import json
+import math
+
+import numpy as np
+
+
+class Zone:
+    """
+    Base class for a no-fly zone.
+    `min_alt` / `max_alt` restrict the zone to an altitude band (None = unbounded).
+    """
+
+    kind = "zone"
+
+    def __init__(self, zone_id: str, min_alt: float = None, max_alt: float = None):
+        self.zone_id = str(zone_id)
+        self.min_alt = min_alt
+        self.max_alt = max_alt
+
+    def bbox(self) -> tuple:
+        """Return (min_x, min_y, max_x, max_y)."""
+        raise NotImplementedError
+
+    def contains_xy(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def contains(self, x: np.ndarray, y: np.ndarray, z: np.ndarray = None) -> np.ndarray:
+        """Vectorized membership test, including the altitude band."""
+        mask = self.contains_xy(x, y)
+        if z is not None:
+            if self.min_alt is not None:
+                mask &= z >= self.min_alt
+            if self.max_alt is not None:
+                mask &= z <= self.max_alt
+        return mask
+
+    def reference_point(self) -> tuple:
+        """Point used to measure how close a drone came to the zone."""
+        min_x, min_y, max_x, max_y = self.bbox()
+        return (min_x + max_x) / 2, (min_y + max_y) / 2
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.zone_id,
+            "type": self.kind,
+            "min_alt": self.min_alt,
+            "max_alt": self.max_alt,
+        }
+
+
+class CircleZone(Zone):
+    kind = "circle"
+
+    def __init__(self, zone_id, center_x: float, center_y: float, radius: float, **kwargs):
+        super().__init__(zone_id, **kwargs)
+        self.center_x = float(center_x)
+        self.center_y = float(center_y)
+        self.radius = float(radius)
+
+    def bbox(self) -> tuple:
+        r = self.radius
+        return (self.center_x - r, self.center_y - r, self.center_x + r, self.center_y + r)
+
+    def contains_xy(self, x, y):
+        dx = x - self.center_x
+        dy = y - self.center_y
+        return dx * dx + dy * dy <= self.radius * self.radius
+
+    def reference_point(self) -> tuple:
+        return self.center_x, self.center_y
+
+    def to_dict(self) -> dict:
+        data = super().to_dict()
+        data.update(center=[self.center_x, self.center_y], radius=self.radius)
+        return data
+
+
+class PolygonZone(Zone):
+    kind = "polygon"
+
+    def __init__(self, zone_id, points: list, **kwargs):
+        super().__init__(zone_id, **kwargs)
+        if len(points) < 3:
+            raise ValueError(f"Polygon zone {zone_id} needs at least 3 points")
+        self.points = np.asarray(points, dtype=np.float64)
+
+    def bbox(self) -> tuple:
+        min_x, min_y = self.points.min(axis=0)
+        max_x, max_y = self.points.max(axis=0)
+        return (float(min_x), float(min_y), float(max_x), float(max_y))
+
+    def contains_xy(self, x, y):
+        # Even-odd ray casting, vectorized over the points
+        inside = np.zeros(np.shape(x), dtype=bool)
+        xj, yj = self.points[-1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for xi, yi in self.points:
+                crosses = (yi > y) != (yj > y)
+                x_cross = (xj - xi) * (y - yi) / (yj - yi) + xi
+                inside ^= crosses & (x < x_cross)
+                xj, yj = xi, yi
+        return inside
+
+    def to_dict(self) -> dict:
+        data = super().to_dict()
+        data.update(points=self.points.tolist())
+        return data
+
+
+def zone_from_dict(spec: dict) -> Zone:
+    """
+    Build a zone from its config / DB representation, e.g.
+    {"id": "hq", "type": "circle", "center": [0, 0], "radius": 1000}
+    {"id": "port", "type": "polygon", "points": [[0, 0], [10, 0], [10, 10]], "max_alt": 120}
+    """
+    kind = spec.get("type", "circle")
+    common = {
+        "zone_id": spec.get("id", ""),
+        "min_alt": spec.get("min_alt"),
+        "max_alt": spec.get("max_alt"),
+    }
+
+    if kind == "circle":
+        center_x, center_y = spec.get("center", (0.0, 0.0))
+        return CircleZone(center_x=center_x, center_y=center_y, radius=spec["radius"], **common)
+    if kind == "polygon":
+        return PolygonZone(points=spec["points"], **common)
+
+    raise ValueError(f"Unknown zone type: {kind}")
+
+
+def load_zone_file(path: str) -> list:
+    """Load a JSON list of zone specs from disk."""
+    with open(path) as fh:
+        return [zone_from_dict(spec) for spec in json.load(fh)]
+
+
+class ZoneRegistry:
+    """
+    Set of no-fly zones behind a uniform grid index.
+    Each drone is tested only against the zones whose bounding box overlaps
+    its grid cell, so classification cost does not grow with the zone count.
+    """
+
+    # Zones covering more cells than this are checked against every drone
+    MAX_CELLS_PER_ZONE = 4096
+
+    # With this few zones a plain vectorized check beats the grid lookup
+    BRUTE_FORCE_MAX_ZONES = 4
+
+    def __init__(self, zones: list, cell_size: float = None):
+        self.zones = list(zones)
+        self.cell_size = float(cell_size or self._default_cell_size(self.zones))
+        self._global = []
+        grid = {}
+
+        for index, zone in enumerate(self.zones):
+            min_x, min_y, max_x, max_y = zone.bbox()
+            ix0, iy0 = self._cell(min_x), self._cell(min_y)
+            ix1, iy1 = self._cell(max_x), self._cell(max_y)
+
+            few_zones = len(self.zones) <= self.BRUTE_FORCE_MAX_ZONES
+            if few_zones or (ix1 - ix0 + 1) * (iy1 - iy0 + 1) > self.MAX_CELLS_PER_ZONE:
+                self._global.append(index)
+                continue
+
+            for ix in range(ix0, ix1 + 1):
+                for iy in range(iy0, iy1 + 1):
+                    grid.setdefault(self._key(ix, iy), []).append(index)
+
+        # CSR layout: zones of cell _cell_keys[i] are _cell_zones[_cell_offsets[i]:_cell_offsets[i + 1]]
+        self._cell_keys = np.array(sorted(grid), dtype=np.int64)
+        counts = [len(grid[key]) for key in self._cell_keys.tolist()]
+        self._cell_offsets = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)])
+        self._cell_zones = np.fromiter(
+            (index for key in self._cell_keys.tolist() for index in grid[key]),
+            np.int64,
+            int(self._cell_offsets[-1]),
+        )
+
+        # Circle parameters as arrays, so all circle tests run in one vectorized step
+        n = len(self.zones)
+        self._is_circle = np.zeros(n, dtype=bool)
+        self._cx = np.zeros(n)
+        self._cy = np.zeros(n)
+        self._r2 = np.zeros(n)
+        self._min_alt = np.full(n, -np.inf)
+        self._max_alt = np.full(n, np.inf)
+        for index, zone in enumerate(self.zones):
+            if zone.min_alt is not None:
+                self._min_alt[index] = zone.min_alt
+            if zone.max_alt is not None:
+                self._max_alt[index] = zone.max_alt
+            if isinstance(zone, CircleZone):
+                self._is_circle[index] = True
+                self._cx[index] = zone.center_x
+                self._cy[index] = zone.center_y
+                self._r2[index] = zone.radius * zone.radius
+
+        # Polygon edges, CSR by zone: (x0, y0) -> (x1, y1)
+        edge_counts = np.zeros(n, dtype=np.int64)
+        edges = []
+        for index, zone in enumerate(self.zones):
+            if isinstance(zone, PolygonZone):
+                points = zone.points
+                edges.append(np.hstack([points, np.roll(points, -1, axis=0)]))
+                edge_counts[index] = len(points)
+        self._edge_offsets = np.concatenate([[0], np.cumsum(edge_counts)])
+        self._edges = np.vstack(edges) if edges else np.zeros((0, 4))
+
+    def __len__(self) -> int:
+        return len(self.zones)
+
+    @staticmethod
+    def _default_cell_size(zones: list) -> float:
+        if not zones:
+            return 1000.0
+        extents = [max(b[2] - b[0], b[3] - b[1]) for b in (z.bbox() for z in zones)]
+        return max(float(np.median(extents)), 1.0)
+
+    def _cell(self, value: float) -> int:
+        return math.floor(value / self.cell_size)
+
+    @staticmethod
+    def _key(ix, iy):
+        # Pack two signed 32-bit cell coordinates into one int64
+        return (ix << 32) ^ (iy & 0xFFFFFFFF)
+
+    def classify(self, x, y, z=None) -> np.ndarray:
+        """
+        Return, for every point, the index of a zone containing it
+        (-1 when the point is outside every zone).
+        """
+        x = np.atleast_1d(np.asarray(x, dtype=np.float64))
+        y = np.atleast_1d(np.asarray(y, dtype=np.float64))
+        if z is not None:
+            z = np.atleast_1d(np.asarray(z, dtype=np.float64))
+
+        result = np.full(x.shape, -1, dtype=np.int64)
+        if not self.zones or x.size == 0:
+            return result
+
+        for index in self._global:
+            hit = (result < 0) & self.zones[index].contains(x, y, z)
+            result[hit] = index
+
+        if self._cell_keys.size == 0:
+            return result
+
+        finite = np.isfinite(x) & np.isfinite(y)
+        ix = np.zeros(x.shape, dtype=np.int64)
+        iy = np.zeros(x.shape, dtype=np.int64)
+        ix[finite] = np.floor(x[finite] / self.cell_size)
+        iy[finite] = np.floor(y[finite] / self.cell_size)
+        keys = (ix << 32) ^ (iy & 0xFFFFFFFF)
+
+        # Locate each drone's cell; only drones in a cell holding zones go on
+        pos = np.searchsorted(self._cell_keys, keys)
+        pos[pos == self._cell_keys.size] = 0
+        candidates = np.flatnonzero(finite & (self._cell_keys[pos] == keys) & (result < 0))
+        if candidates.size == 0:
+            return result
+
+        # Expand to (drone, zone) pairs for the zones sharing the drone's cell
+        starts = self._cell_offsets[pos[candidates]]
+        counts = self._cell_offsets[pos[candidates] + 1] - starts
+        drones = np.repeat(candidates, counts)
+        within = np.arange(drones.size) - np.repeat(np.cumsum(counts) - counts, counts)
+        zone_ids = self._cell_zones[np.repeat(starts, counts) + within]
+
+        hit = np.zeros(drones.size, dtype=bool)
+        if z is not None:
+            band = (z[drones] >= self._min_alt[zone_ids]) & (z[drones] <= self._max_alt[zone_ids])
+        else:
+            band = np.ones(drones.size, dtype=bool)
+
+        circle = self._is_circle[zone_ids]
+        dc, zc = drones[circle], zone_ids[circle]
+        dx = x[dc] - self._cx[zc]
+        dy = y[dc] - self._cy[zc]
+        hit[circle] = dx * dx + dy * dy <= self._r2[zc]
+
+        polygon = np.flatnonzero(~circle)
+        if polygon.size:
+            hit[polygon] = self._polygon_hits(x[drones[polygon]], y[drones[polygon]], zone_ids[polygon])
+
+        hit &= band
+        result[drones[hit]] = zone_ids[hit]
+        return result
+
+    def _polygon_hits(self, px, py, zone_ids) -> np.ndarray:
+        """Even-odd test of each (point, polygon) pair, vectorized over all edges at once."""
+        starts = self._edge_offsets[zone_ids]
+        counts = self._edge_offsets[zone_ids + 1] - starts
+        pair = np.repeat(np.arange(zone_ids.size), counts)
+        within = np.arange(pair.size) - np.repeat(np.cumsum(counts) - counts, counts)
+        x0, y0, x1, y1 = self._edges[np.repeat(starts, counts) + within].T
+
+        ey = py[pair]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crosses = ((y0 > ey) != (y1 > ey)) & (px[pair] < (x1 - x0) * (ey - y0) / (y1 - y0) + x0)
+
+        return np.bincount(pair[crosses], minlength=zone_ids.size) % 2 == 1
+
+    def to_list(self) -> list:
+        return [zone.to_dict() for zone in self.zones]
+
+
+def default_zones() -> list:
+    """The original single 1000-unit circle at the origin."""
+    return [CircleZone("default", 0.0, 0.0, 1000.0)]
@@ -0,0 +1,97 @@
+"""
+Benchmark: upstream drone list ingestion, response.json() vs. streamed chunks.
+
+    python -m benchmarks.bench_ingest
+    python -m benchmarks.bench_ingest --drones 1000000 --bandwidth 50
+
+The list is served by an in-process httpx transport in 64 KiB pieces,
+optionally throttled to --bandwidth MB/s to look like a real download.
+Reports total time, time until the first drones are classified, and peak
+Python memory (tracemalloc) while ingesting.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+
+import httpx
+
+from app.fetcher import iter_json_items
+from app.geometry import DEFAULT_REGISTRY, ChunkClassifier, classify_zones, drones_to_arrays
+from benchmarks.bench_nfz import make_fleet
+
+PIECE = 64 * 1024
+
+
+def serve(body: bytes, bandwidth: float) -> httpx.AsyncClient:
+    async def pieces():
+        for start in range(0, len(body), PIECE):
+            if bandwidth:
+                await asyncio.sleep(PIECE / (bandwidth * 1e6))
+            yield body[start:start + PIECE]
+
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=pieces()))
+    return httpx.AsyncClient(transport=transport)
+
+
+async def whole_body(client: httpx.AsyncClient) -> tuple:
+    """The previous path: wait for the whole body, json(), then classify everything."""
+    start = time.perf_counter()
+    response = await client.get("http://upstream/drones")
+    drones = response.json()
+    classify_zones(drones_to_arrays(drones), DEFAULT_REGISTRY)
+    first = time.perf_counter() - start
+    return len(drones), first, time.perf_counter() - start
+
+
+async def streamed(client: httpx.AsyncClient, chunk_size: int) -> tuple:
+    """fetch_drones' path: parse incrementally and classify each chunk on arrival."""
+    start = time.perf_counter()
+    first = None
+    drones = []
+    classifier = ChunkClassifier(DEFAULT_REGISTRY)
+    async with client.stream("GET", "http://upstream/drones") as response:
+        async for chunk in iter_json_items(response.aiter_bytes(), chunk_size):
+            classifier(chunk, len(drones))
+            drones.extend(chunk)
+            if first is None:
+                first = time.perf_counter() - start
+    return len(drones), first, time.perf_counter() - start
+
+
+def measure(fn, body: bytes, bandwidth: float, *args) -> tuple:
+    """Timings from a plain run, peak memory from a second, traced run."""
+    async def run():
+        async with serve(body, bandwidth) as client:
+            return await fn(client, *args)
+
+    count, first, total = asyncio.run(run())
+
+    tracemalloc.start()
+    asyncio.run(run())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, first, total, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--drones", type=int, default=200_000)
+    parser.add_argument("--chunk", type=int, default=5000)
+    parser.add_argument("--bandwidth", type=float, default=0, help="MB/s, 0 = unthrottled")
+    args = parser.parse_args()
+
+    body = json.dumps(make_fleet(args.drones)).encode()
+    print(f"{args.drones} drones, {len(body) / 1e6:.1f} MB body")
+    print(f"{'path':>8} | {'first result (ms)':>17} | {'total (ms)':>10} | {'peak (MB)':>9}")
+
+    for name, fn, extra in (("json()", whole_body, ()), ("stream", streamed, (args.chunk,))):
+        count, first, total, peak = measure(fn, body, args.bandwidth, *extra)
+        assert count == args.drones
+        print(f"{name:>8} | {first * 1e3:>17.1f} | {total * 1e3:>10.1f} | {peak / 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark: per-drone NFZ loop vs. vectorized batch classification.
+
+    python -m benchmarks.bench_nfz
+    python -m benchmarks.bench_nfz --sizes 1000 100000
+"""
+
+import argparse
+import random
+import time
+
+from app.geometry import drones_to_arrays, classify_batch, violation_records
+
+
+def make_fleet(n: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"drone-{i}",
+            "owner_id": rng.randint(1, 5000),
+            "x": rng.uniform(-8000, 8000),
+            "y": rng.uniform(-8000, 8000),
+            "z": rng.uniform(0, 500),
+        }
+        for i in range(n)
+    ]
+
+
+def loop_scan(drones: list) -> list:
+    """The previous scan_for_violations loop: one dict walk + check per drone."""
+    hits = []
+    for drone in drones:
+        try:
+            x = drone["x"]
+            y = drone["y"]
+            z = drone.get("z", 0)
+            drone_id = drone.get("id")
+            owner_id = drone.get("owner_id")
+            if owner_id is None:
+                continue
+            owner_id = str(owner_id)
+            if x ** 2 + y ** 2 <= 1000 ** 2:
+                hits.append((drone_id, owner_id, x, y, z))
+        except KeyError:
+            continue
+    return hits
+
+
+def batch_scan(drones: list):
+    batch = drones_to_arrays(drones)
+    return violation_records(batch, classify_batch(batch))
+
+
+def best_of(fn, arg, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'drones':>10} | {'loop (ms)':>10} | {'batch (ms)':>10} | {'classify (ms)':>13} | {'speedup':>7}")
+    for n in args.sizes:
+        drones = make_fleet(n)
+        assert len(loop_scan(drones)) == len(batch_scan(drones))
+
+        t_loop = best_of(loop_scan, drones, args.repeat)
+        t_batch = best_of(batch_scan, drones, args.repeat)
+        batch = drones_to_arrays(drones)
+        t_classify = best_of(classify_batch, batch, args.repeat)
+
+        print(
+            f"{n:>10} | {t_loop * 1e3:>10.2f} | {t_batch * 1e3:>10.2f} | "
+            f"{t_classify * 1e3:>13.2f} | {t_loop / t_batch:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Benchmark: /nfz page building, ORM objects + ViolationOut vs. column tuples + orjson.
+
+    python -m benchmarks.bench_serialize
+    python -m benchmarks.bench_serialize --sizes 1000 10000 --db
+
+Without --db only serialization is measured, on rows built in memory.
+With --db the rows are written to DATABASE_URL (owner "bench-owner",
+drones "bench-*"), fetched through both paths, and deleted afterwards.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select
+from sqlalchemy.orm import joinedload
+
+from app.drone_db import SessionLocal, AsyncSessionLocal, async_engine
+from app.model import Owner, Violation
+from app.schemas import ViolationOut
+from app.violation_queries import encode_violations, violations_page
+
+BENCH_OWNER = "bench-owner"
+
+
+def make_owner() -> Owner:
+    return Owner(
+        id=BENCH_OWNER,
+        first_name="Bench",
+        last_name="Owner",
+        email="bench@example.com",
+        phone_number="+000",
+        social_security_number="000-00-0000",
+    )
+
+
+def make_violations(n: int, owner: Owner, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    start = datetime.now(timezone.utc) - timedelta(hours=1)
+    return [
+        Violation(
+            id=i + 1,
+            drone_id=f"bench-{i}",
+            owner_id=owner.id,
+            owner=owner,
+            timestamp=start + timedelta(milliseconds=i),
+            x=rng.uniform(-1000, 1000),
+            y=rng.uniform(-1000, 1000),
+            z=rng.uniform(0, 500),
+        )
+        for i in range(n)
+    ]
+
+
+def as_tuples(violations: list) -> list:
+    """The same rows in the shape violations_page returns."""
+    return [
+        (v.id, v.drone_id, v.timestamp, v.x, v.y, v.z, v.owner.first_name,
+         v.owner.last_name, v.owner.social_security_number, v.owner.phone_number)
+        for v in violations
+    ]
+
+
+def orm_encode(violations: list) -> bytes:
+    """The previous response path: one ViolationOut per row, then JSONResponse."""
+    body = [ViolationOut.from_orm(v).model_dump(mode="json") for v in violations]
+    return JSONResponse(body).body
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_memory(n: int, repeat: int) -> tuple:
+    violations = make_violations(n, make_owner())
+    rows = as_tuples(violations)
+    assert json.loads(orm_encode(violations)) == json.loads(encode_violations(rows))
+
+    return (
+        best_of(lambda: orm_encode(violations), repeat),
+        best_of(lambda: encode_violations(rows), repeat),
+    )
+
+
+def seed_db(n: int):
+    with SessionLocal() as db:
+        if db.get(Owner, BENCH_OWNER) is None:
+            db.add(make_owner())
+            db.flush()
+        db.add_all(
+            Violation(drone_id=v.drone_id, owner_id=BENCH_OWNER, timestamp=v.timestamp, x=v.x, y=v.y, z=v.z)
+            for v in make_violations(n, make_owner())
+        )
+        db.commit()
+
+
+def clean_db():
+    with SessionLocal() as db:
+        db.execute(delete(Violation).where(Violation.owner_id == BENCH_OWNER))
+        db.execute(delete(Owner).where(Owner.id == BENCH_OWNER))
+        db.commit()
+
+
+async def bench_db(n: int, repeat: int) -> tuple:
+    async def orm_path():
+        async with AsyncSessionLocal() as db:
+            violations = (await db.scalars(
+                select(Violation)
+                .where(Violation.owner_id == BENCH_OWNER)
+                .options(joinedload(Violation.owner))
+                .order_by(Violation.timestamp, Violation.id)
+                .limit(n)
+            )).all()
+            return orm_encode(violations)
+
+    async def lean_path():
+        async with AsyncSessionLocal() as db:
+            rows, _, _ = await violations_page(db, None, n)
+            return encode_violations(rows)
+
+    async def best(fn):
+        result, elapsed = None, float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = await fn()
+            elapsed = min(elapsed, time.perf_counter() - start)
+        return result, elapsed
+
+    try:
+        orm_body, t_orm = await best(orm_path)
+        lean_body, t_lean = await best(lean_path)
+    finally:
+        # Each asyncio.run() is a new loop, the pooled connections can't be reused
+        await async_engine.dispose()
+    assert json.loads(orm_body) == json.loads(lean_body), "paths disagree (other rows in the window?)"
+    return t_orm, t_lean
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", action="store_true", help="also fetch the rows from DATABASE_URL")
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} | {'stage':>9} | {'ORM (ms)':>9} | {'lean (ms)':>9} | {'speedup':>7}")
+    for n in args.sizes:
+        t_orm, t_lean = bench_memory(n, args.repeat)
+        print(f"{n:>8} | {'serialize':>9} | {t_orm * 1e3:>9.2f} | {t_lean * 1e3:>9.2f} | {t_orm / t_lean:>6.1f}x")
+
+        if args.db:
+            clean_db()
+            seed_db(n)
+            try:
+                t_orm, t_lean = asyncio.run(bench_db(n, args.repeat))
+            finally:
+                clean_db()
+            print(f"{n:>8} | {'db+json':>9} | {t_orm * 1e3:>9.2f} | {t_lean * 1e3:>9.2f} | {t_orm / t_lean:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
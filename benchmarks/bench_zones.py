@@ -0,0 +1,76 @@
+"""
+Benchmark: grid-indexed multi-zone classification vs. checking every zone.
+
+    python -m benchmarks.bench_zones
+    python -m benchmarks.bench_zones --zones 10000 --drones 100000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.zones import CircleZone, PolygonZone, ZoneRegistry
+
+
+def make_zones(n: int, extent: float, seed: int = 7) -> list:
+    rng = np.random.default_rng(seed)
+    zones = []
+    for i in range(n):
+        cx, cy = rng.uniform(-extent, extent, 2)
+        size = rng.uniform(20, 200)
+        if i % 3 == 0:
+            angles = np.sort(rng.uniform(0, 2 * np.pi, 6))
+            points = np.column_stack([cx + size * np.cos(angles), cy + size * np.sin(angles)])
+            zones.append(PolygonZone(f"poly-{i}", points.tolist(), max_alt=rng.uniform(100, 400)))
+        else:
+            zones.append(CircleZone(f"circle-{i}", cx, cy, size, min_alt=rng.uniform(0, 50)))
+    return zones
+
+
+def brute_force(zones: list, x, y, z) -> np.ndarray:
+    result = np.full(x.shape, -1, dtype=np.int64)
+    for index, zone in enumerate(zones):
+        hit = (result < 0) & zone.contains(x, y, z)
+        result[hit] = index
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--zones", type=int, default=10_000)
+    parser.add_argument("--drones", type=int, default=100_000)
+    parser.add_argument("--extent", type=float, default=50_000)
+    parser.add_argument("--brute-drones", type=int, default=10_000,
+                        help="brute force is run on this many drones and scaled up")
+    args = parser.parse_args()
+
+    zones = make_zones(args.zones, args.extent)
+    rng = np.random.default_rng(1)
+    x, y = rng.uniform(-args.extent, args.extent, (2, args.drones))
+    z = rng.uniform(0, 500, args.drones)
+
+    start = time.perf_counter()
+    registry = ZoneRegistry(zones)
+    t_build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = registry.classify(x, y, z)
+    t_indexed = time.perf_counter() - start
+
+    n = min(args.brute_drones, args.drones)
+    start = time.perf_counter()
+    brute = brute_force(zones, x[:n], y[:n], z[:n])
+    t_brute = (time.perf_counter() - start) * args.drones / n
+
+    assert np.array_equal(indexed[:n] >= 0, brute >= 0)
+
+    print(f"zones={args.zones} drones={args.drones} cell_size={registry.cell_size:.1f}")
+    print(f"index build:      {t_build * 1e3:10.1f} ms")
+    print(f"indexed classify: {t_indexed * 1e3:10.1f} ms ({int((indexed >= 0).sum())} inside)")
+    print(f"brute force (est):{t_brute * 1e3:10.1f} ms")
+    print(f"speedup:          {t_brute / t_indexed:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
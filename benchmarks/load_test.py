@@ -0,0 +1,276 @@
+"""
+End-to-end load test: scans and API endpoints against the upstream simulator.
+
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --drones 100000 --scans 20 --requests 500 --concurrency 20
+    python -m benchmarks.load_test --latency 0.05 --error-rate 0.01
+    python -m benchmarks.load_test --save
+
+Needs the app's Postgres and Redis (DATABASE_URL, REDIS_URL, ... as for the
+worker) and writes violations like a real scan, so use a dev database.
+DRONES_LIST_API and DRONES_API are pointed at a benchmarks.upstream_sim
+process started here, or at a running one given with --upstream.
+
+Scans run in this process, exactly as the worker runs scan_for_violations,
+with a fresh drone snapshot each time; --warmup scans (filling the owner
+cache) are not measured. The API is then driven in-process over ASGI, so
+endpoint latencies include the DB and Redis but not the network. Triggered
+scans are suppressed during that phase, so it measures the endpoints alone,
+and the /nfz hot window is loaded first, as the beat task would have.
+
+Reports p50/p99 latency, scans per second, and DB and upstream HTTP round
+trips per scan. --save stores the results as the baseline for these
+parameters in benchmarks/baselines/load_test.json; later runs with the same
+parameters are compared with it, and anything more than --tolerance worse
+is flagged (exit status 1).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+BASELINE_FILE = Path(__file__).parent / "baselines" / "load_test.json"
+
+# Metrics where a higher value is better; everything else should go down
+HIGHER_IS_BETTER = ("scans_per_s", "rps")
+
+
+def start_simulator(args) -> subprocess.Popen:
+    process = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.upstream_sim",
+        "--port", str(args.port),
+        "--drones", str(args.drones),
+        "--owners", str(args.owners),
+        "--latency", str(args.latency),
+        "--jitter", str(args.jitter),
+        "--error-rate", str(args.error_rate),
+    ])
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{args.port}/_stats").raise_for_status()
+            return process
+        except httpx.HTTPError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Upstream simulator did not start")
+
+
+def upstream_requests(upstream: str) -> int:
+    stats = httpx.get(f"{upstream}/_stats").json()
+    return sum(count for endpoint, count in stats.items() if ":" not in endpoint)
+
+
+def percentiles(latencies: list) -> dict:
+    p50, p99 = np.percentile(np.asarray(latencies) * 1e3, [50, 99])
+    return {"p50_ms": round(float(p50), 2), "p99_ms": round(float(p99), 2)}
+
+
+def count_db_round_trips(*engines) -> dict:
+    """Statements and commits sent through the given engines, counted as they happen."""
+    from sqlalchemy import event
+
+    counter = {"round_trips": 0}
+
+    def bump(*args, **kwargs):
+        counter["round_trips"] += 1
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", bump)
+        event.listen(engine, "commit", bump)
+    return counter
+
+
+def run_scans(args, upstream: str, db_counter: dict) -> dict:
+    from app.config import settings
+    from app.tasks import scan_for_violations
+
+    # Every scan fetches and classifies a new snapshot, as at the real scan rate
+    snapshot_interval, settings.SNAPSHOT_INTERVAL = settings.SNAPSHOT_INTERVAL, 0
+
+    try:
+        for _ in range(args.warmup):
+            scan_for_violations(token=uuid.uuid4().hex)
+
+        latencies = []
+        db_before, http_before = db_counter["round_trips"], upstream_requests(upstream)
+        started = time.perf_counter()
+        for _ in range(args.scans):
+            scan_started = time.perf_counter()
+            scan_for_violations(token=uuid.uuid4().hex)
+            latencies.append(time.perf_counter() - scan_started)
+        elapsed = time.perf_counter() - started
+    finally:
+        settings.SNAPSHOT_INTERVAL = snapshot_interval
+
+    return {
+        **percentiles(latencies),
+        "scans_per_s": round(args.scans / elapsed, 3),
+        "db_round_trips": round((db_counter["round_trips"] - db_before) / args.scans, 1),
+        "http_round_trips": round((upstream_requests(upstream) - http_before) / args.scans, 1),
+    }
+
+
+async def drive_endpoint(client: httpx.AsyncClient, path: str, headers: dict, requests: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {**percentiles(latencies), "rps": round(requests / elapsed, 1), "errors": errors}
+
+
+async def run_endpoints(args) -> dict:
+    from app.config import settings
+    from app.main import app
+    from app.tasks import trim_violation_window
+
+    # /nfz asks for a scan on every call; keep them collapsed so only the endpoints are measured
+    settings.SCAN_MIN_INTERVAL = float("inf")
+    trim_violation_window()
+
+    endpoints = (
+        ("/drones", "/drones?limit=100", {}),
+        ("/nfz", "/nfz", {"X-Secret": settings.X_SECRET}),
+        ("/api/map-data", "/api/map-data", {}),
+    )
+
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=60) as client:
+            return {
+                name: await drive_endpoint(client, path, headers, args.requests, args.concurrency)
+                for name, path, headers in endpoints
+            }
+    finally:
+        await app.router.shutdown()
+
+
+def flatten(results: dict) -> dict:
+    flat = {f"scan.{metric}": value for metric, value in results["scan"].items()}
+    for endpoint, metrics in results["endpoints"].items():
+        flat.update({f"{endpoint}.{metric}": value for metric, value in metrics.items() if metric != "errors"})
+    return flat
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Metrics more than `tolerance` (a fraction) worse than the baseline."""
+    current, previous = flatten(results), flatten(baseline)
+    regressions = []
+    for metric, before in previous.items():
+        after = current.get(metric)
+        if after is None or not before:
+            continue
+        change = (after - before) / before
+        if metric.endswith(HIGHER_IS_BETTER):
+            change = -change
+        if change > tolerance:
+            regressions.append(f"{metric}: {before} -> {after} ({change:+.0%} worse)")
+    return regressions
+
+
+def scenario(args) -> str:
+    return f"{args.drones}d-{args.owners}o-{args.latency}s-{args.error_rate}err-c{args.concurrency}"
+
+
+def print_results(results: dict):
+    scan = results["scan"]
+    print(
+        f"scan        p50 {scan['p50_ms']:>9.1f} ms | p99 {scan['p99_ms']:>9.1f} ms | "
+        f"{scan['scans_per_s']:.2f} scans/s | {scan['db_round_trips']} DB, "
+        f"{scan['http_round_trips']} HTTP round trips per scan"
+    )
+    for endpoint, metrics in results["endpoints"].items():
+        print(
+            f"{endpoint:<11} p50 {metrics['p50_ms']:>9.1f} ms | p99 {metrics['p99_ms']:>9.1f} ms | "
+            f"{metrics['rps']:.1f} req/s | {metrics['errors']} errors"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drones", type=int, default=10000)
+    parser.add_argument("--owners", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.0, help="upstream seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--scans", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=200, help="per endpoint")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--upstream", help="URL of a running simulator (started here if omitted)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown vs. the baseline")
+    parser.add_argument("--save", action="store_true", help="store the results as the baseline")
+    args = parser.parse_args()
+
+    simulator = None
+    if args.upstream is None:
+        simulator = start_simulator(args)
+        args.upstream = f"http://127.0.0.1:{args.port}"
+    upstream = args.upstream.rstrip("/")
+
+    # Read by app.config at import time, so set before any app module is imported
+    os.environ["DRONES_LIST_API"] = f"{upstream}/drones"
+    os.environ["DRONES_API"] = f"{upstream}/owners/"
+
+    try:
+        from app.drone_db import async_engine, engine
+        from app.migrate import run_migrations
+
+        run_migrations()
+        db_counter = count_db_round_trips(engine, async_engine.sync_engine)
+        results = {"scan": run_scans(args, upstream, db_counter)}
+        results["endpoints"] = asyncio.run(run_endpoints(args))
+    finally:
+        if simulator is not None:
+            simulator.terminate()
+            simulator.wait()
+
+    print(f"\nScenario {scenario(args)}")
+    print_results(results)
+
+    baselines = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+    baseline = baselines.get(scenario(args))
+
+    if args.save:
+        baselines[scenario(args)] = results
+        BASELINE_FILE.parent.mkdir(exist_ok=True)
+        BASELINE_FILE.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline saved to {BASELINE_FILE}")
+    elif baseline is None:
+        print("No baseline for this scenario yet (run with --save to store one)")
+    else:
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"Within {args.tolerance:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Local stand-in for the external drone APIs, for load tests and offline work.
+
+    python -m benchmarks.upstream_sim --port 8090 --drones 50000 --owners 5000
+    python -m benchmarks.upstream_sim --port 8090 --latency 0.05 --jitter 0.02 --error-rate 0.01
+
+Point the app at it with
+    DRONES_LIST_API=http://localhost:8090/drones
+    DRONES_API=http://localhost:8090/owners/
+
+GET /drones         the fleet; drones fly in straight lines and bounce off the
+                    edges of the area, so every request sees them moved
+GET /owners/{id}    one owner, 404 for ids outside 1..--owners
+GET /_stats         requests served per endpoint (and injected errors)
+POST /_stats/reset  zero the counters
+
+Every request waits --latency +/- --jitter seconds, and fails with a 503 with
+probability --error-rate. The fleet is generated from --seed, so runs with the
+same arguments see the same drones.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+
+import numpy as np
+import orjson
+from fastapi import FastAPI, HTTPException, Response
+
+# Half-width of the square the drones fly in; the default zone is a 1000-unit circle at 0,0
+AREA = 8000.0
+
+
+class Fleet:
+    """Synthetic drones with fixed velocities, positions computed per request."""
+
+    def __init__(self, drones: int, owners: int, speed: float, seed: int):
+        rng = np.random.default_rng(seed)
+        self.ids = [f"sim-{i}" for i in range(drones)]
+        self.owner_ids = rng.integers(1, owners + 1, size=drones).tolist()
+        self.origin = rng.uniform(-AREA, AREA, size=(2, drones))
+        self.velocity = rng.uniform(-speed, speed, size=(2, drones))
+        self.z = rng.uniform(0, 500, size=drones)
+        self.started = time.monotonic()
+
+    def positions(self, elapsed: float) -> tuple:
+        # Fold the straight path back into [-AREA, AREA] (bouncing off the edges)
+        travelled = self.origin + self.velocity * elapsed + AREA
+        folded = np.abs((travelled % (4 * AREA)) - 2 * AREA) - AREA
+        return folded[0], folded[1]
+
+    def snapshot(self) -> bytes:
+        x, y = self.positions(time.monotonic() - self.started)
+        return orjson.dumps([
+            {"id": drone_id, "owner_id": owner_id, "x": px, "y": py, "z": pz}
+            for drone_id, owner_id, px, py, pz in zip(
+                self.ids, self.owner_ids, x.tolist(), y.tolist(), self.z.tolist()
+            )
+        ])
+
+
+def make_owner(owner_id: int) -> dict:
+    rng = random.Random(owner_id)
+    return {
+        "first_name": f"First{owner_id}",
+        "last_name": f"Last{owner_id}",
+        "email": f"owner{owner_id}@example.com",
+        "phone_number": f"+358{rng.randint(10**8, 10**9 - 1)}",
+        "social_security_number": f"{rng.randint(10**5, 10**6 - 1)}-{owner_id:04d}",
+        "purchased_at": "2024-01-01T00:00:00",
+    }
+
+
+def create_app(
+    drones: int = 10000,
+    owners: int = 5000,
+    speed: float = 20.0,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    seed: int = 42,
+) -> FastAPI:
+    app = FastAPI()
+    fleet = Fleet(drones, owners, speed, seed)
+    stats = Counter()
+    rng = random.Random(seed)
+
+    async def upstream(endpoint: str):
+        """Latency and error injection shared by both APIs."""
+        stats[endpoint] += 1
+        delay = latency + rng.uniform(-jitter, jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if error_rate and rng.random() < error_rate:
+            stats[f"{endpoint}:errors"] += 1
+            raise HTTPException(status_code=503, detail="Injected upstream error")
+
+    # Encoded with orjson: the simulator should not be the bottleneck
+    @app.get("/drones")
+    async def list_drones():
+        await upstream("drones")
+        return Response(fleet.snapshot(), media_type="application/json")
+
+    @app.get("/owners/{owner_id}")
+    async def get_owner(owner_id: str):
+        await upstream("owners")
+        if not owner_id.isdigit() or not 1 <= int(owner_id) <= owners:
+            raise HTTPException(status_code=404, detail="Owner not found")
+        return make_owner(int(owner_id))
+
+    @app.get("/_stats")
+    def get_stats():
+        return dict(stats)
+
+    @app.post("/_stats/reset")
+    def reset_stats():
+        stats.clear()
+        return {}
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--drones", type=int, default=10000)
+    parser.add_argument("--owners", type=int, default=5000)
+    parser.add_argument("--speed", type=float, default=20.0, help="max speed per axis, units/s")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds around --latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with 503")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    app = create_app(
+        drones=args.drones,
+        owners=args.owners,
+        speed=args.speed,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Initial schema (owners, violations, no_fly_zones)
+
+Databases created earlier by Base.metadata.create_all already have these
+tables; they are left untouched, so both fresh and existing databases can
+run `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "owners" not in existing:
+        op.create_table(
+            "owners",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("first_name", sa.String(100)),
+            sa.Column("last_name", sa.String(100)),
+            sa.Column("email", sa.String(200)),
+            sa.Column("phone_number", sa.String(50)),
+            sa.Column("social_security_number", sa.String(50)),
+            sa.Column("purchased_at", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.create_index("ix_owners_id", "owners", ["id"])
+
+    if "violations" not in existing:
+        op.create_table(
+            "violations",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("drone_id", sa.String(100)),
+            sa.Column("owner_id", sa.String(), sa.ForeignKey("owners.id")),
+            sa.Column("x", sa.Float()),
+            sa.Column("y", sa.Float()),
+            sa.Column("z", sa.Float()),
+            sa.Column("timestamp", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_violations_id", "violations", ["id"])
+
+    if "no_fly_zones" not in existing:
+        op.create_table(
+            "no_fly_zones",
+            sa.Column("id", sa.String(100), primary_key=True),
+            sa.Column("name", sa.String(200), nullable=True),
+            sa.Column("kind", sa.String(20), nullable=False),
+            sa.Column("geometry", sa.Text(), nullable=False),
+            sa.Column("min_alt", sa.Float(), nullable=True),
+            sa.Column("max_alt", sa.Float(), nullable=True),
+            sa.Column("active", sa.Boolean(), nullable=False),
+        )
+
+
+def downgrade():
+    op.drop_table("no_fly_zones")
+    op.drop_table("violations")
+    op.drop_table("owners")
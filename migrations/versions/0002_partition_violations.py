@@ -0,0 +1,109 @@
+"""Partition violations by day and index timestamp / owner_id
+
+The table is rebuilt as `PARTITION BY RANGE (timestamp)` with one
+partition per day plus a default partition; existing rows are copied
+over. The primary key becomes (id, timestamp), as Postgres requires the
+partition key in it. Later partitions are created and old ones dropped
+by app.partitions.maintain_partitions (Celery beat).
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from datetime import datetime, time, timedelta, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+DAYS_AHEAD = 7
+
+
+def _create_day(day):
+    lower = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    upper = lower + timedelta(days=1)
+    op.execute(
+        f"CREATE TABLE violations_p{day:%Y%m%d} PARTITION OF violations "
+        f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+    )
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        op.create_index("ix_violations_timestamp_id", "violations", ["timestamp", "id"])
+        op.create_index("ix_violations_owner_id", "violations", ["owner_id"])
+        return
+
+    op.execute("ALTER TABLE violations RENAME TO violations_legacy")
+    op.execute("ALTER SEQUENCE violations_id_seq OWNED BY NONE")
+
+    op.execute(
+        """
+        CREATE TABLE violations (
+            id INTEGER NOT NULL DEFAULT nextval('violations_id_seq'),
+            drone_id VARCHAR(100),
+            owner_id VARCHAR REFERENCES owners (id),
+            x DOUBLE PRECISION,
+            y DOUBLE PRECISION,
+            z DOUBLE PRECISION,
+            timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+        """
+    )
+    op.execute("ALTER SEQUENCE violations_id_seq OWNED BY violations.id")
+    op.execute("CREATE TABLE violations_default PARTITION OF violations DEFAULT")
+
+    # One partition per day from the oldest stored row up to a week ahead
+    today = datetime.now(timezone.utc).date()
+    oldest = bind.execute(sa.text("SELECT min(timestamp) FROM violations_legacy")).scalar()
+    day = min(oldest.astimezone(timezone.utc).date(), today) if oldest else today
+    while day <= today + timedelta(days=DAYS_AHEAD):
+        _create_day(day)
+        day += timedelta(days=1)
+
+    op.execute(
+        """
+        INSERT INTO violations (id, drone_id, owner_id, x, y, z, timestamp)
+        SELECT id, drone_id, owner_id, x, y, z, COALESCE(timestamp, now())
+        FROM violations_legacy
+        """
+    )
+    op.execute("DROP TABLE violations_legacy")
+
+    op.create_index("ix_violations_timestamp_id", "violations", ["timestamp", "id"])
+    op.create_index("ix_violations_owner_id", "violations", ["owner_id"])
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        op.drop_index("ix_violations_owner_id", "violations")
+        op.drop_index("ix_violations_timestamp_id", "violations")
+        return
+
+    op.execute("ALTER TABLE violations RENAME TO violations_partitioned")
+    op.execute("ALTER SEQUENCE violations_id_seq OWNED BY NONE")
+    op.execute(
+        """
+        CREATE TABLE violations (
+            id INTEGER NOT NULL DEFAULT nextval('violations_id_seq') PRIMARY KEY,
+            drone_id VARCHAR(100),
+            owner_id VARCHAR REFERENCES owners (id),
+            x DOUBLE PRECISION,
+            y DOUBLE PRECISION,
+            z DOUBLE PRECISION,
+            timestamp TIMESTAMP WITH TIME ZONE
+        )
+        """
+    )
+    op.execute("ALTER SEQUENCE violations_id_seq OWNED BY violations.id")
+    op.execute("INSERT INTO violations SELECT * FROM violations_partitioned")
+    op.execute("DROP TABLE violations_partitioned")
+    op.create_index("ix_violations_id", "violations", ["id"])
@@ -0,0 +1,38 @@
+"""Add violation_episodes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "violation_episodes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("drone_id", sa.String(100), nullable=False),
+        sa.Column("owner_id", sa.String(), sa.ForeignKey("owners.id")),
+        sa.Column("zone_id", sa.String(100)),
+        sa.Column("opened_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_seen_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("closed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("closest_distance", sa.Float()),
+        sa.Column("closest_x", sa.Float()),
+        sa.Column("closest_y", sa.Float()),
+        sa.Column("closest_z", sa.Float()),
+        sa.Column("sample_count", sa.Integer(), nullable=False, server_default="1"),
+    )
+    op.create_index("ix_violation_episodes_drone_id", "violation_episodes", ["drone_id"])
+    op.create_index("ix_violation_episodes_opened_at", "violation_episodes", ["opened_at"])
+
+
+def downgrade():
+    op.drop_table("violation_episodes")
@@ -0,0 +1,81 @@
+"""Add violation rollups (per owner, per drone, per hour)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "violation_stats_owner",
+        sa.Column("owner_id", sa.String(), sa.ForeignKey("owners.id"), primary_key=True),
+        sa.Column("violation_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("first_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_violation_stats_owner_count", "violation_stats_owner", ["violation_count"])
+
+    op.create_table(
+        "violation_stats_drone",
+        sa.Column("drone_id", sa.String(100), primary_key=True),
+        sa.Column("owner_id", sa.String(), sa.ForeignKey("owners.id")),
+        sa.Column("violation_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("first_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_violation_stats_drone_count", "violation_stats_drone", ["violation_count"])
+
+    op.create_table(
+        "violation_stats_hourly",
+        sa.Column("hour", sa.DateTime(timezone=True), primary_key=True),
+        sa.Column("violation_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    # Backfill once from the existing history; the app keeps them current from here
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute(
+        """
+        INSERT INTO violation_stats_owner (owner_id, violation_count, first_at, last_at)
+        SELECT owner_id, count(*), min(timestamp), max(timestamp)
+        FROM violations
+        WHERE owner_id IS NOT NULL
+        GROUP BY owner_id
+        """
+    )
+    # The latest owner seen for each drone
+    op.execute(
+        """
+        INSERT INTO violation_stats_drone (drone_id, owner_id, violation_count, first_at, last_at)
+        SELECT drone_id,
+               (array_agg(owner_id ORDER BY timestamp DESC))[1],
+               count(*), min(timestamp), max(timestamp)
+        FROM violations
+        WHERE drone_id IS NOT NULL
+        GROUP BY drone_id
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO violation_stats_hourly (hour, violation_count)
+        SELECT date_trunc('hour', timestamp AT TIME ZONE 'UTC') AT TIME ZONE 'UTC', count(*)
+        FROM violations
+        GROUP BY 1
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("violation_stats_hourly")
+    op.drop_table("violation_stats_drone")
+    op.drop_table("violation_stats_owner")
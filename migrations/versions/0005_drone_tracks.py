@@ -0,0 +1,35 @@
+"""Add drone_tracks
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "drone_tracks",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("drone_id", sa.String(100), nullable=False),
+        sa.Column("start_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("end_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("sample_count", sa.Integer(), nullable=False),
+        sa.Column("t", sa.LargeBinary(), nullable=False),
+        sa.Column("x", sa.LargeBinary(), nullable=False),
+        sa.Column("y", sa.LargeBinary(), nullable=False),
+        sa.Column("z", sa.LargeBinary(), nullable=False),
+    )
+    op.create_index("ix_drone_tracks_drone_id_start_at", "drone_tracks", ["drone_id", "start_at"])
+    op.create_index("ix_drone_tracks_end_at", "drone_tracks", ["end_at"])
+
+
+def downgrade():
+    op.drop_table("drone_tracks")
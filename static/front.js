@@ -36,8 +36,18 @@ function displayViolations(violations) {
 	});
 }
 
-// Call this function when your page loads
-document.addEventListener('DOMContentLoaded', fetchViolations);
+// Call this function when your page loads, and again whenever the scanner reports new violations
+document.addEventListener('DOMContentLoaded', () => {
+	fetchViolations();
+
+	const stream = new EventSource('http://localhost:8000/stream');
+	stream.addEventListener('delta', event => {
+		const delta = JSON.parse(event.data);
+		if (delta.new_violations.length > 0) {
+			fetchViolations();
+		}
+	});
+});
 
 //<p>Owner: ${violation.owner.first_name} ${violation.owner.last_name}</p>
 //<p>Contact: ${violation.owner.phone_number}</p> 
\ No newline at end of file
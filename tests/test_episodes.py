@@ -0,0 +1,157 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app import episodes
+from app.config import settings
+from app.episodes import OPEN_KEY, collect_sightings, track_episodes
+from app.geometry import classify_zones, drones_to_arrays
+from app.model import ViolationEpisode
+from app.redis_client import redis_client
+
+
+WEST = (-2000.0, 0.0)
+EAST = (2000.0, 0.0)
+OUTSIDE = (0.0, 0.0)
+
+
+@pytest.fixture
+def violations(monkeypatch):
+    """
+    report_violations without the Postgres-only violations table and rollups:
+    rows get ids and a timestamp, before_commit runs, the transaction commits.
+    """
+    written = []
+
+    def report_violations(records, db, before_commit=None):
+        now = datetime.now(timezone.utc)
+        rows = [{**record, "id": len(written) + i + 1, "timestamp": now} for i, record in enumerate(records)]
+        written.extend(rows)
+        if before_commit is not None:
+            before_commit(rows)
+        db.commit()
+        return rows
+
+    monkeypatch.setattr(episodes, "report_violations", report_violations)
+    return written
+
+
+@pytest.fixture
+def close_after(monkeypatch):
+    def set_close_after(seconds: float):
+        monkeypatch.setattr(settings, "EPISODE_CLOSE_AFTER", seconds)
+    set_close_after(3600.0)
+    return set_close_after
+
+
+def sightings(registry, *positions, owner_id="o1") -> dict:
+    """Sightings of (drone id, (x, y)) positions, as a scan would collect them."""
+    drones = [{"id": drone_id, "owner_id": owner_id, "x": x + 1, "y": y, "z": 10.0} for drone_id, (x, y) in positions]
+    batch = drones_to_arrays(drones)
+    return collect_sightings(batch, classify_zones(batch, registry), registry)
+
+
+def open_state() -> dict:
+    return {drone_id.decode(): json.loads(raw) for drone_id, raw in redis_client.hgetall(OPEN_KEY).items()}
+
+
+def stored_episodes(db) -> list:
+    db.expire_all()
+    return db.scalars(select(ViolationEpisode).order_by(ViolationEpisode.id)).all()
+
+
+def test_only_drones_with_an_id_and_owner_inside_a_zone_are_sighted(zones):
+    drones = [
+        {"id": "in", "owner_id": "o1", "x": -2000, "y": 0},
+        {"id": "out", "owner_id": "o1", "x": 0, "y": 0},
+        {"id": "ownerless", "x": -2000, "y": 0},
+        {"owner_id": "o1", "x": -2000, "y": 0},
+    ]
+    batch = drones_to_arrays(drones)
+
+    found = collect_sightings(batch, classify_zones(batch, zones), zones)
+
+    assert list(found) == ["in"]
+    assert found["in"]["zone_id"] == "west"
+    assert found["in"]["distance"] == 0.0
+
+
+def test_first_sighting_opens_an_episode(db, zones, violations, close_after):
+    counts = track_episodes(sightings(zones, ("d1", WEST)), db)
+
+    assert counts == {"opened": 1, "continued": 0, "closed": 0}
+    assert [row["drone_id"] for row in violations] == ["d1"]
+    [episode] = stored_episodes(db)
+    assert (episode.drone_id, episode.zone_id, episode.closed_at) == ("d1", "west", None)
+    assert open_state()["d1"]["id"] == episode.id
+
+
+def test_staying_inside_updates_only_redis(db, zones, violations, close_after):
+    track_episodes(sightings(zones, ("d1", (WEST[0] + 300, 0.0))), db)
+
+    counts = track_episodes(sightings(zones, ("d1", (WEST[0] + 100, 0.0))), db)
+    track_episodes(sightings(zones, ("d1", (WEST[0] + 200, 0.0))), db)
+
+    assert counts == {"opened": 0, "continued": 1, "closed": 0}
+    assert len(violations) == 1
+    state = open_state()["d1"]
+    assert state["samples"] == 3
+    assert state["closest"][0] == pytest.approx(101.0)
+    [episode] = stored_episodes(db)
+    assert episode.sample_count == 1
+
+
+def test_episode_closes_once_the_drone_is_gone_long_enough(db, zones, violations, close_after):
+    track_episodes(sightings(zones, ("d1", WEST)), db)
+    track_episodes(sightings(zones, ("d1", WEST)), db)
+
+    counts = track_episodes({}, db)
+    assert counts["closed"] == 0
+    assert "d1" in open_state()
+
+    close_after(0.0)
+    counts = track_episodes({}, db)
+
+    assert counts == {"opened": 0, "continued": 0, "closed": 1}
+    [episode] = stored_episodes(db)
+    assert episode.closed_at is not None
+    assert episode.sample_count == 2
+    assert open_state() == {}
+
+
+def test_moving_into_another_zone_starts_a_new_episode(db, zones, violations, close_after):
+    track_episodes(sightings(zones, ("d1", WEST)), db)
+
+    counts = track_episodes(sightings(zones, ("d1", EAST)), db)
+
+    assert counts == {"opened": 1, "continued": 0, "closed": 1}
+    assert len(violations) == 2
+    west, east = stored_episodes(db)
+    assert (west.zone_id, east.zone_id) == ("west", "east")
+    assert west.closed_at is not None
+    assert east.closed_at is None
+    assert open_state()["d1"]["id"] == east.id
+    assert open_state()["d1"]["zone_id"] == "east"
+
+
+def test_episodes_stored_without_a_zone_continue_in_any_zone(db, zones, violations, close_after):
+    track_episodes(sightings(zones, ("d1", WEST)), db)
+    legacy = open_state()["d1"]
+    del legacy["zone_id"]
+    redis_client.hset(OPEN_KEY, "d1", json.dumps(legacy))
+
+    counts = track_episodes(sightings(zones, ("d1", EAST)), db)
+
+    assert counts == {"opened": 0, "continued": 1, "closed": 0}
+    assert len(violations) == 1
+
+
+def test_drones_are_tracked_independently(db, zones, violations, close_after):
+    track_episodes(sightings(zones, ("d1", WEST), ("d2", EAST)), db)
+
+    counts = track_episodes(sightings(zones, ("d1", WEST), ("d3", OUTSIDE)), db)
+
+    assert counts == {"opened": 0, "continued": 1, "closed": 0}
+    assert set(open_state()) == {"d1", "d2"}
@@ -0,0 +1,82 @@
+import pytest
+
+from app.config import settings
+from app.scheduler import choose_interval
+
+
+@pytest.fixture(autouse=True)
+def schedule_settings(monkeypatch):
+    monkeypatch.setattr(settings, "SCAN_INTERVAL_MIN", 2.0)
+    monkeypatch.setattr(settings, "SNAPSHOT_INTERVAL", 5.0)
+    monkeypatch.setattr(settings, "SCAN_INTERVAL_DEFAULT", 10.0)
+    monkeypatch.setattr(settings, "SCAN_INTERVAL_MAX", 60.0)
+    monkeypatch.setattr(settings, "SCAN_BACKOFF", 1.5)
+    monkeypatch.setattr(settings, "PREDICT_HORIZON", 30.0)
+
+
+def test_failed_scan_retries_at_the_default_interval():
+    interval, _, cause = choose_interval(100, 5, [], previous=60.0, failed=True)
+    assert (interval, cause) == (10.0, "failed")
+
+
+def test_drones_inside_scan_no_faster_than_the_snapshot():
+    interval, _, cause = choose_interval(100, 3, [], previous=10.0)
+    assert (interval, cause) == (5.0, "inside")
+
+
+def test_min_interval_wins_when_above_the_snapshot_interval(monkeypatch):
+    monkeypatch.setattr(settings, "SCAN_INTERVAL_MIN", 8.0)
+    interval, _, _ = choose_interval(100, 3, [], previous=10.0)
+    assert interval == 8.0
+
+
+@pytest.mark.parametrize("eta, expected", [
+    (1.0, 5.0),      # entry imminent: floor, not eta / 2
+    (40.0, 20.0),    # half the time to the first entry
+    (500.0, 60.0),   # far off: capped at the max
+])
+def test_approaching_scans_before_the_first_entry(eta, expected):
+    approaching = [{"eta": eta}, {"eta": eta + 10}]
+    interval, _, cause = choose_interval(100, 0, approaching, previous=10.0)
+    assert (interval, cause) == (expected, "approaching")
+
+
+def test_empty_sky_waits_the_max():
+    interval, _, cause = choose_interval(0, 0, [], previous=10.0)
+    assert (interval, cause) == (60.0, "empty")
+
+
+def test_quiet_traffic_backs_off_up_to_the_prediction_horizon():
+    intervals = []
+    previous = 10.0
+    for _ in range(6):
+        previous, _, cause = choose_interval(100, 0, [], previous=previous)
+        assert cause == "quiet"
+        intervals.append(previous)
+
+    assert intervals == [15.0, 22.5, 30.0, 30.0, 30.0, 30.0]
+
+
+def test_quiet_traffic_never_goes_below_the_default():
+    interval, _, _ = choose_interval(100, 0, [], previous=1.0)
+    assert interval == 10.0
+
+
+def test_max_below_the_floor_is_raised_to_it(monkeypatch):
+    monkeypatch.setattr(settings, "SCAN_INTERVAL_MAX", 3.0)
+
+    assert choose_interval(0, 0, [], previous=10.0)[0] == 5.0
+    assert choose_interval(100, 0, [{"eta": 100.0}], previous=10.0)[0] == 5.0
+    assert choose_interval(100, 0, [], previous=10.0)[0] == 5.0
+
+
+@pytest.mark.parametrize("drones, inside, approaching, previous", [
+    (0, 0, [], 0.0),
+    (10, 0, [], 1000.0),
+    (10, 2, [], 0.0),
+    (10, 0, [{"eta": 0.0}], 0.0),
+    (10, 0, [{"eta": 1e6}], 1e6),
+])
+def test_interval_stays_within_bounds(drones, inside, approaching, previous):
+    interval, _, _ = choose_interval(drones, inside, approaching, previous)
+    assert 5.0 <= interval <= 60.0
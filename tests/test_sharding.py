@@ -0,0 +1,150 @@
+import time
+
+import numpy as np
+import orjson
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.episodes import collect_sightings
+from app.geometry import classify_zones, drones_to_arrays
+from app.model import Owner
+from app.owner_cache import owner_cache
+from app.redis_client import redis_client
+from app.sharding import (
+    FROZEN_KEY, SHARD_KEY, _shard_payloads, freeze_snapshot, load_frozen, merge_shards, release_frozen,
+    scan_shard, shard_of,
+)
+from app.snapshot import DroneSnapshot
+
+
+SHARDS = 3
+
+
+def fleet(n: int = 60) -> list:
+    """Every third drone over "west", every third over "east", the rest outside."""
+    drones = []
+    for i in range(n):
+        x = (-2000, 2000, 0)[i % 3] + i
+        drones.append({"id": f"d{i}", "owner_id": f"o{i % 7}", "x": x, "y": 10.0, "z": 50.0})
+    drones[3]["owner_id"] = None
+    drones[4]["x"] = "malformed"
+    return drones
+
+
+def pre_classified(drones: list, registry) -> list:
+    zone_idx = classify_zones(drones_to_arrays(drones), registry)
+    return [[i, registry.zones[zone_idx[i]].zone_id] for i in np.flatnonzero(zone_idx >= 0).tolist()]
+
+
+def run_sharded(token: str, snapshot: DroneSnapshot, db: Session) -> tuple:
+    freeze_snapshot(token, snapshot, SHARDS)
+    results = [scan_shard(token, shard, db) for shard in range(SHARDS)]
+    _, batch = load_frozen(token)
+    return results, batch, merge_shards(results, batch, db)
+
+
+def test_payloads_split_every_drone_exactly_once(zones):
+    drones = fleet()
+    batch = drones_to_arrays(drones)
+    snapshot = DroneSnapshot(version=1, fetched_at=time.time(), drones=drones)
+
+    payloads = _shard_payloads(snapshot, batch, SHARDS)
+
+    seen = []
+    for shard, payload in enumerate(payloads):
+        rows = np.frombuffer(payload["rows"], dtype=np.int64)
+        x, y, z = np.frombuffer(payload["xyz"], dtype=np.float64).reshape(3, -1)
+        assert payload["drones"] == len(rows)
+        assert all(shard_of(drones[row]["id"], SHARDS) == shard for row in rows.tolist())
+        np.testing.assert_array_equal(x, batch.x[rows])
+        np.testing.assert_array_equal(z, batch.z[rows])
+        seen.extend(rows.tolist())
+
+    assert sorted(seen) == list(range(len(drones)))
+
+
+def test_pre_classified_payloads_only_carry_violators(zones):
+    drones = fleet()
+    inside = pre_classified(drones, zones)
+    snapshot = DroneSnapshot(version=1, fetched_at=time.time(), drones=drones, inside=inside)
+
+    payloads = _shard_payloads(snapshot, drones_to_arrays(drones), SHARDS)
+
+    assert all("xyz" not in payload for payload in payloads)
+    assert sum(payload["drones"] for payload in payloads) == len(drones)
+    split = [pair for payload in payloads for pair in orjson.loads(payload["inside"])]
+    assert sorted(split) == sorted(inside)
+
+
+@pytest.mark.parametrize("classified", [False, True], ids=["shards-classify", "pre-classified"])
+def test_merge_matches_a_single_task_scan(db, zones, owner_api, classified):
+    drones = fleet()
+    inside = pre_classified(drones, zones) if classified else None
+    snapshot = DroneSnapshot(version=1, fetched_at=time.time(), drones=drones, inside=inside)
+
+    results, batch, (zone_idx, registry, sightings) = run_sharded("scan-1", snapshot, db)
+
+    expected_idx = classify_zones(drones_to_arrays(drones), zones)
+    np.testing.assert_array_equal(zone_idx, expected_idx)
+    assert sightings == collect_sightings(drones_to_arrays(drones), expected_idx, zones)
+    assert batch.malformed == 1
+    assert sum(result["drones"] for result in results) == len(drones)
+
+
+def test_shards_warm_the_owners_of_their_violators(db, zones, owner_api):
+    drones = fleet()
+    snapshot = DroneSnapshot(version=1, fetched_at=time.time(), drones=drones)
+
+    _, _, (_, _, sightings) = run_sharded("scan-1", snapshot, db)
+
+    violators = {sighting["owner_id"] for sighting in sightings.values()}
+    cached, missing = owner_cache.get_many(violators)
+    assert not missing
+    assert all(cached[owner_id] is not None for owner_id in violators)
+    assert set(db.scalars(select(Owner.id))) == violators
+
+
+def test_shards_sharing_a_new_owner_store_it_once(engine, db, zones, monkeypatch):
+    # Drones of one new owner, inside a zone, spread over every shard
+    drones = [{"id": f"d{i}", "owner_id": "shared", "x": -2000 + i, "y": 0.0, "z": 10.0} for i in range(20)]
+    assert len({shard_of(drone["id"], SHARDS) for drone in drones}) == SHARDS
+    freeze_snapshot("scan-1", DroneSnapshot(version=1, fetched_at=time.time(), drones=drones), SHARDS)
+
+    async def fetch_owners(owner_ids):
+        # Another shard stores the owner while this one waits on the owners API
+        with Session(engine) as other:
+            if other.get(Owner, "shared") is None:
+                other.add(Owner(id="shared", first_name="Other", last_name="Shard"))
+                other.commit()
+        return {owner_id: {
+            "first_name": "First", "last_name": "Last", "email": "e",
+            "phone_number": "p", "social_security_number": "s",
+        } for owner_id in owner_ids}
+
+    monkeypatch.setattr("app.utils.fetch_owners", fetch_owners)
+    results = [scan_shard("scan-1", shard, db) for shard in range(SHARDS)]
+
+    assert sum(len(result["inside"]) for result in results) == len(drones)
+    assert db.scalar(select(func.count()).select_from(Owner)) == 1
+
+
+def test_redelivered_shard_reads_its_payload_again(db, zones, owner_api):
+    snapshot = DroneSnapshot(version=1, fetched_at=time.time(), drones=fleet())
+    freeze_snapshot("scan-1", snapshot, SHARDS)
+
+    first = scan_shard("scan-1", 0, db)
+    again = scan_shard("scan-1", 0, db)
+
+    assert again["inside"] == first["inside"]
+
+
+def test_release_removes_every_key(db, zones):
+    freeze_snapshot("scan-1", DroneSnapshot(version=1, fetched_at=time.time(), drones=fleet()), SHARDS)
+
+    release_frozen("scan-1")
+
+    keys = [FROZEN_KEY.format(token="scan-1")] + [SHARD_KEY.format(token="scan-1", shard=s) for s in range(SHARDS)]
+    assert not redis_client.exists(*keys)
+    with pytest.raises(LookupError):
+        load_frozen("scan-1")
@@ -0,0 +1,105 @@
+import numpy as np
+
+from app.geometry import drones_to_arrays
+from app.tracks import COORD_DTYPE, TIME_DTYPE, TrackBuffer
+
+
+def scan(*positions):
+    """DroneBatch of (drone id, x) pairs, y = 2x, z = 10."""
+    return drones_to_arrays([{"id": drone_id, "x": x, "y": 2 * x, "z": 10} for drone_id, x in positions])
+
+
+def samples(chunk, column, dtype=COORD_DTYPE):
+    return np.frombuffer(chunk[column], dtype=dtype).tolist()
+
+
+def test_drain_returns_samples_oldest_first():
+    buffer = TrackBuffer(capacity=4)
+    for second in range(3):
+        buffer.append(scan(("a", second), ("b", 100 + second)), 1000.0 + second)
+
+    chunks = {chunk["drone_id"]: chunk for chunk in buffer.drain()}
+
+    assert samples(chunks["a"], "t", TIME_DTYPE) == [1000.0, 1001.0, 1002.0]
+    assert samples(chunks["a"], "x") == [0.0, 1.0, 2.0]
+    assert samples(chunks["b"], "y") == [200.0, 202.0, 204.0]
+    assert chunks["a"]["sample_count"] == 3
+    assert chunks["a"]["start_at"].timestamp() == 1000.0
+    assert chunks["a"]["end_at"].timestamp() == 1002.0
+
+
+def test_ring_wraps_around_and_keeps_the_newest_samples():
+    buffer = TrackBuffer(capacity=3)
+    for second in range(7):
+        buffer.append(scan(("a", second)), 1000.0 + second)
+
+    assert buffer.due()
+    [chunk] = buffer.drain()
+
+    assert chunk["sample_count"] == 3
+    assert samples(chunk, "x") == [4.0, 5.0, 6.0]
+    assert samples(chunk, "t", TIME_DTYPE) == [1004.0, 1005.0, 1006.0]
+    assert chunk["start_at"].timestamp() == 1004.0
+    assert chunk["end_at"].timestamp() == 1006.0
+
+
+def test_rings_wrap_independently():
+    buffer = TrackBuffer(capacity=3)
+    for second in range(5):
+        drones = [("a", second)] + ([("b", 50 + second)] if second >= 3 else [])
+        buffer.append(scan(*drones), 1000.0 + second)
+
+    chunks = {chunk["drone_id"]: chunk for chunk in buffer.drain()}
+
+    assert samples(chunks["a"], "x") == [2.0, 3.0, 4.0]
+    assert samples(chunks["b"], "x") == [53.0, 54.0]
+
+
+def test_drain_resets_the_buffer():
+    buffer = TrackBuffer(capacity=3)
+    buffer.append(scan(("a", 1)), 1000.0)
+    buffer.drain()
+
+    assert len(buffer) == 0
+    assert buffer.drain() == []
+
+    buffer.append(scan(("b", 2)), 1001.0)
+    [chunk] = buffer.drain()
+    assert chunk["drone_id"] == "b"
+    assert chunk["sample_count"] == 1
+
+
+def test_rescanning_the_same_snapshot_adds_nothing():
+    buffer = TrackBuffer(capacity=4)
+    buffer.append(scan(("a", 1)), 1000.0)
+    buffer.append(scan(("a", 1)), 1000.0)
+
+    [chunk] = buffer.drain()
+    assert chunk["sample_count"] == 1
+
+
+def test_duplicate_drone_keeps_its_last_position():
+    buffer = TrackBuffer(capacity=4)
+    buffer.append(scan(("a", 1), ("a", 2)), 1000.0)
+
+    [chunk] = buffer.drain()
+    assert samples(chunk, "x") == [2.0]
+
+
+def test_malformed_positions_are_skipped():
+    buffer = TrackBuffer(capacity=4)
+    batch = drones_to_arrays([{"id": "a", "x": 1, "y": 1}, {"id": "b", "x": "far"}])
+    buffer.append(batch, 1000.0)
+
+    assert [chunk["drone_id"] for chunk in buffer.drain()] == ["a"]
+
+
+def test_grows_past_its_initial_slots():
+    buffer = TrackBuffer(capacity=2, initial_slots=2)
+    buffer.append(scan(*((f"d{i}", i) for i in range(5))), 1000.0)
+    buffer.append(scan(*((f"d{i}", 10 + i) for i in range(5))), 1001.0)
+
+    chunks = {chunk["drone_id"]: chunk for chunk in buffer.drain()}
+
+    assert len(chunks) == 5
+    assert samples(chunks["d4"], "x") == [4.0, 14.0]